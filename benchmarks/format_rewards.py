@@ -0,0 +1,123 @@
+"""
+Compares :func:`utils.format_rewards` against how it used to work - matching regexes
+against every item's name, rebuilding its quip lists and formatting every item's text on
+each call.
+
+Doesn't need a database - the items are loaded from `config/items`.
+
+    python -m benchmarks.format_rewards
+"""
+
+import random
+import re
+import timeit
+import typing
+
+from cogs import utils
+
+
+CALLS = 100_000
+
+
+class Bot:
+    """
+    The bits of :class:`voxelbotutils.Bot` that loading items uses.
+    """
+
+    def get_emoji(self, emoji_id: int) -> None:
+        return None
+
+
+def legacy_format_rewards(
+    *,
+    inches: typing.Optional[int] = None,
+    items: typing.Optional[typing.List[utils.LootableItem]] = None,
+):
+    """
+    The old :func:`utils.format_rewards`.
+    """
+
+    items_as_text = []
+    if not inches:
+        if not items:
+            return "**{}**".format(
+                random.choice(
+                    [
+                        "literally nothing",
+                        "nothing lmao",
+                        "nothing L",
+                        "nothing <a:KEK_COMFY:884797245621420102>",
+                    ]
+                )
+            )
+        for item in items:
+            if item.amount == 1:
+                article = (
+                    "an" if re.match(r"^[aeiou]", item.name, re.IGNORECASE) else "a"
+                )
+                items_as_text.append(f"{article} **{item.emoji} {item.name}**")
+            else:
+                plural = "" if re.match(r".*s$", item.name, re.IGNORECASE) else "s"
+                items_as_text.append(
+                    f"{item.amount}x **{item.emoji} {item.name}**{plural}"
+                )
+        if len(items_as_text) == 1:
+            return items_as_text[0]
+        return "{} and {}".format(", ".join(items_as_text[:-1]), items_as_text[-1])
+    elif not items:
+        return "**{}{} {}**".format(
+            "+" if inches > 0 else "",
+            inches,
+            random.choice(
+                ["cock size", "pp size", "peepee size", "dick size", "inches"]
+            ),
+        )
+    for item in items:
+        if item.amount == 1:
+            article = "an" if re.match(r"^[aeiou]", item.name, re.IGNORECASE) else "a"
+            items_as_text.append(f"{article} **{item.emoji} {item.name}**")
+        else:
+            plural = "" if re.match(r".*s$", item.name, re.IGNORECASE) else "s"
+            items_as_text.append(f"{item.amount}x **{item.emoji} {item.name}**{plural}")
+    return "{} and {}".format(
+        ", ".join(items_as_text),
+        "**{}{} {}**".format(
+            "+" if inches > 0 else "",
+            inches,
+            random.choice(
+                ["cock size", "pp size", "peepee size", "dick size", "inches"]
+            ),
+        ),
+    )
+
+
+def main():
+    config, _ = utils.load_config()
+    items = list(utils.Registry.build(Bot(), config).items["all"].values())
+
+    # A typical /beg reward - some inches and a few stacks, one of them a single item
+    loot = [
+        utils.LootableItem(items[0], 1),
+        utils.LootableItem(items[1], 7),
+        utils.LootableItem(items[2], 42),
+    ]
+
+    # Same quips both ways, so the output can be compared
+    random.seed(0)
+    expected = legacy_format_rewards(inches=25, items=loot)
+    random.seed(0)
+    assert utils.format_rewards(inches=25, items=loot) == expected, expected
+
+    print(f"{'version':>10} {'total':>9} {'per call':>10}")
+    for name, function in (
+        ("legacy", legacy_format_rewards),
+        ("compiled", utils.format_rewards),
+    ):
+        seconds = timeit.timeit(
+            lambda: function(inches=25, items=loot), number=CALLS
+        )
+        print(f"{name:>10} {seconds:>8.3f}s {seconds / CALLS * 1e6:>8.2f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compares rolling on a begging location's loot table one roll at a time, the old way (looking
+up every item and building a fresh stack per drop) and with :class:`utils.CompiledLootTable`,
+against rolling for lots of users at once with :meth:`utils.CompiledLootTable.sample`.
+
+Doesn't need a database - the items and locations are loaded from `config/`.
+
+    python -m benchmarks.loot_tables
+"""
+
+import timeit
+
+from cogs import utils
+
+
+USERS = 1_000
+ROLLS = 10
+
+
+class Bot:
+    """
+    The bits of :class:`voxelbotutils.Bot` that rolling on loot tables uses.
+    """
+
+    items: dict
+
+    def get_emoji(self, emoji_id: int) -> None:
+        return None
+
+
+def main():
+    bot = Bot()
+    config, _ = utils.load_config()
+    registry = utils.Registry.build(bot, config)
+    bot.items = registry.items
+    loot_table: utils.LootTable = registry.begging["locations"][0].loot_table
+    compiled: utils.CompiledLootTable = loot_table.compiled
+
+    def legacy():
+        loot_table.compiled = None
+        try:
+            for _ in range(USERS * ROLLS):
+                loot_table.get_random_loot(bot, 3, boosted=True)
+        finally:
+            loot_table.compiled = compiled
+
+    def single():
+        for _ in range(USERS * ROLLS):
+            loot_table.get_random_loot(bot, 3, boosted=True)
+
+    def batch():
+        compiled.sample(USERS, ROLLS, max_items=3, boosted=True)
+
+    print(f"{USERS * ROLLS} rolls of {len(compiled)} items")
+    print(f"{'version':>10} {'total':>9} {'per roll':>10}")
+    for name, function in (("legacy", legacy), ("compiled", single), ("batch", batch)):
+        seconds = min(timeit.repeat(function, number=1, repeat=5))
+        print(f"{name:>10} {seconds:>8.4f}s {seconds / (USERS * ROLLS) * 1e6:>8.2f}µs")
+
+
+if __name__ == "__main__":
+    main()
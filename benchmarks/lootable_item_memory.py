@@ -0,0 +1,86 @@
+"""
+Compares the memory used by a 10k-row inventory of :class:`utils.LootableItem` stacks against
+the same inventory built from full item clones (how :class:`utils.LootableItem` used to copy
+every field of its :class:`utils.Item`).
+
+Doesn't need a database - the items are loaded from `config/items`.
+
+    python -m benchmarks.lootable_item_memory
+"""
+
+import pathlib
+import tracemalloc
+import typing
+
+import toml
+
+from cogs import utils
+
+
+ROWS = 10_000
+
+
+class Bot:
+    """
+    The bits of :class:`voxelbotutils.Bot` that loading items uses.
+    """
+
+    def get_emoji(self, emoji_id: int) -> None:
+        return None
+
+
+class ClonedLootableItem:
+    """
+    The old :class:`utils.LootableItem` - an instance dict holding a copy of every field of
+    the item, plus the amount.
+    """
+
+    def __init__(self, item: utils.Item, amount: int):
+        self.id = item.id
+        self.type = item.type
+        self.rarity = item.rarity
+        self.emoji = item.emoji
+        self.name = item.name
+        self.description = item.description
+        self.skill_requirements = item.skill_requirements
+        self.shop_settings = item.shop_settings
+        self.recipe = item.recipe
+        self.usage = item.usage
+        self.amount = amount
+
+
+def load_items(bot: Bot) -> typing.List[utils.Item]:
+    directory = pathlib.Path(__file__).parent.parent / "config" / "items"
+    return [
+        utils.Item.from_dict(bot, toml.load(path))
+        for path in sorted(directory.glob("*.toml"))
+    ]
+
+
+def measure(build: typing.Callable[[], list]) -> typing.Tuple[int, list]:
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    rows = build()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return end - start, rows
+
+
+def main():
+    items = load_items(Bot())
+
+    # Distinct amounts, so small-int caching doesn't flatter either side
+    def build(cls) -> typing.Callable[[], list]:
+        return lambda: [cls(items[i % len(items)], 1_000 + i) for i in range(ROWS)]
+
+    cloned, _ = measure(build(ClonedLootableItem))
+    flyweight, _ = measure(build(utils.LootableItem))
+
+    print(f"{'layout':>10} {'total':>12} {'per row':>10}")
+    for name, size in (("cloned", cloned), ("flyweight", flyweight)):
+        print(f"{name:>10} {size / 1024:>10.1f}KiB {size / ROWS:>9.1f}B")
+    print(f"{cloned / flyweight:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,101 +1,209 @@
 import asyncio
 import os
 import random
+import signal
+import time
 import typing
 
-import toml
-
 import discord
 from discord.ext import commands, tasks, vbu
 
 from . import utils
 
 
+def _on_sigterm(bot: vbu.Bot):
+    """
+    Drains the user cache (if the economy cog is loaded), then closes the bot.
+    """
+
+    async def shutdown():
+        try:
+            cog: typing.Optional[EconomyCommands] = bot.get_cog("EconomyCommands")
+            if cog is not None and hasattr(bot, "user_cache"):
+                await cog.drain(shutdown=True)
+        finally:
+            await bot.close()
+
+    bot.loop.create_task(shutdown())
+
+
 class EconomyCommands(vbu.Cog):
     def __init__(self, bot: vbu.Bot):
         super().__init__(bot)
         self.bot: vbu.Bot
 
         self.bot.hyperlink = "https://www.youtube.com/watch?v=FP23VU01fz8"
+        self.inventory_menu = self._create_inventory_menu()
         if self.bot.is_ready():
-            self._load_cache()
+            self.bot.loop.create_task(self._load_cache())
 
-    def _load_cache(self):
+    async def _load_cache(self):
         """
         Cache some stuff. Only use when bot is loaded.
         """
 
-        # Let's clean up the items cache
-        try:
-            self.bot.items.clear()
-            self.logger.info("Clearing items cache... success")
-
-        # No cache to clean? then we don't need to do anything
-        except AttributeError:
-            self.logger.warn("Clearing items cache... failed - No items cached")
-
-        if not hasattr(self.bot, "commands_in_use"):
-            self.bot.commands_in_use = {}
-
-        # Load each location from ./config/locations
-        directory = r"config\items"
-        items = []
-        for filename in os.listdir(directory):
-            if filename.endswith(".toml"):
-                items.append(
-                    utils.Item.from_dict(
-                        self.bot, toml.load(os.path.join(directory, filename))
-                    )
-                )
-        self.bot.items = {
-            "shop": {i.id: i for i in items if i.shop_settings.buyable},
-            "auction": {i.id: i for i in items if i.shop_settings.auctionable},
-            "all": {i.id: i for i in items},
-        }
-        self.logger.info("Caching items... success")
+        if not isinstance(
+            getattr(self.bot, "commands_in_use", None), utils.BusyRegistry
+        ):
+            self.bot.commands_in_use = utils.BusyRegistry(
+                ttl=self.bot.config.get("user_cache", {}).get("busy_ttl", 900.0)
+            )
+        if not hasattr(self.bot, "draining"):
+            self.bot.draining = False
+
+        # Save everyone's progress before the process gets killed. This is installed once for
+        # the whole bot and never removed, so unloading the cog doesn't leave SIGTERM unhandled.
+        if not getattr(self.bot, "sigterm_handler_installed", False):
+            try:
+                self.bot.loop.add_signal_handler(signal.SIGTERM, _on_sigterm, self.bot)
+                self.bot.sigterm_handler_installed = True
+            except (NotImplementedError, RuntimeError):
+                self.logger.warn("Adding SIGTERM handler... failed - Not supported")
 
         # No user cache? Let's create it
         if not hasattr(self.bot, "user_cache"):
-            self.bot.user_cache = {}
+            bot = self.bot
+            cache_config = self.bot.config.get("user_cache", {})
+
+            # Share users between processes through Redis, if we can
+            l2 = None
+            if cache_config.get("l2_enabled") and self.bot.config.get(
+                "redis", {}
+            ).get("enabled"):
+                l2 = utils.RedisUserCacheL2(ttl=cache_config.get("l2_ttl", 3600))
+
+            # Journal every change to disk, so a crash doesn't lose anything that hasn't been
+            # written to the database yet. Each process needs its own directory.
+            journal = None
+            if cache_config.get("journal_directory"):
+                journal = utils.Journal(
+                    os.path.join(
+                        cache_config["journal_directory"],
+                        str(min(self.bot.shard_ids or [0])),
+                    ),
+                    commit_interval=cache_config.get("journal_commit_interval", 0.005),
+                    segment_size=cache_config.get(
+                        "journal_segment_size", 4 * 1024 * 1024
+                    ),
+                    logger=self.logger,
+                )
+
+            self.bot.user_cache = utils.UserCache(
+                max_size=cache_config.get("max_size", 10_000),
+                ttl=cache_config.get("ttl", 600.0),
+                is_in_use=lambda user_id: bot.commands_in_use.is_active(user_id),
+                l2=l2,
+                journal=journal,
+            )
             self.logger.info("Creating user cache... success")
 
-        # Now let's start the update db from user cache task
-        self.update_db_from_user_cache.start()
-        self.logger.info("Starting update db from user cache task... success")
+            # Nobody can load users until whatever's left in the journal has been saved
+            if journal is not None:
+                self.bot.loop.create_task(self._replay_journal())
+
+        # Now let's start writing the user cache to the database
+        if hasattr(self, "write_back"):
+            self.write_back.stop()
+        cache_config = self.bot.config.get("user_cache", {})
+        self.write_back = utils.WriteBackScheduler(
+            self.bot.user_cache,
+            self.flush_user_cache,
+            max_dirty=cache_config.get("flush_max_dirty", 1_000),
+            max_staleness=cache_config.get("flush_max_staleness", 30.0),
+            min_interval=cache_config.get("flush_min_interval", 1.0),
+            max_interval=cache_config.get("flush_max_interval", 60.0),
+            target_latency=cache_config.get("flush_target_latency", 0.5),
+            logger=self.logger,
+        )
+        self.write_back.start()
+
+        # If the journal can't be written, the database is the only safe place left
+        if self.bot.user_cache.journal is not None:
+            self.bot.user_cache.journal.error_listener = self.write_back.flush_soon
+        if not self.evict_idle_users.is_running():
+            self.evict_idle_users.start()
+        self.logger.info("Starting user cache write back... success")
+
+        # Load the items and begging config, then keep an eye on it for changes
+        await self.reload_registry()
+        registry_config = self.bot.config.get("registry", {})
+        reload_interval = registry_config.get("reload_interval", 5.0)
+        if reload_interval and not self.watch_config.is_running():
+            self.watch_config.change_interval(seconds=reload_interval)
+            self.watch_config.start()
+
+    async def reload_registry(self) -> bool:
+        """
+        Loads the items and begging config into a new :class:`utils.Registry` and swaps it in.
+        Only files that changed since the last load are parsed again. If the new config doesn't
+        make sense, the old registry is kept. Cached inventories are pointed at the new items
+        as part of the swap.
+
+        Returns:
+            `bool`: Whether a new registry was swapped in.
+        """
+
+        # Load the config from the compiled snapshot, parsing only the files that changed
+        # since it was taken. That's file IO, so keep it off the event loop.
+        start = time.perf_counter()
+        signature = await self.bot.loop.run_in_executor(None, utils.config_signature)
 
-        # Now we clean up the begging cache
+        # Build everything before swapping it in, so commands never see half a registry. A
+        # file that's half saved or missing is no reason to stop watching for the next change.
         try:
-            self.bot.begging.clear()
-            self.logger.info("Clearing begging cache... success")
+            config, parsed = await self.bot.loop.run_in_executor(None, utils.load_config)
+            registry = utils.Registry.build(self.bot, config, signature)
+        except Exception as e:
+            # Don't try the same broken files again on every poll
+            self._failed_config_signature = signature
+            self.logger.error(f"Loading config... failed - {e}")
+            return False
+        for warning in registry.warnings:
+            self.logger.warning(f"Loading config... warning - {warning}")
+        self._swap_registry(registry)
+        self._registry_config = config
+        self.logger.info(
+            f"Loading config... success - {parsed} files parsed, {len(registry.items['all'])} items, {len(registry.begging['locations'])} locations in {time.perf_counter() - start:.3f}s"
+        )
 
-        # No cache to clean? then we don't need to do anything
-        except AttributeError:
-            self.logger.warn(
-                "Clearing begging cache... failed - No begging information cached"
-            )
+        # The database sorts and filters inventories, so it needs to know about the items too
+        try:
+            async with vbu.DatabaseConnection() as db:
+                await utils.sync_item_info(db, registry)
+            self.logger.info("Syncing item info... success")
+        except Exception as e:
+            self.logger.error(f"Syncing item info... failed - {e}")
+        return True
 
-        # Create a dictionary for the begging cache
-        self.bot.begging = {
-            "locations": [],
-        }
-
-        # Load each location
-        directory = r"config\begging"
-        quotes_data = toml.load(os.path.join(directory, "quotes.toml"))
-        for filename in os.listdir(os.path.join(directory, "locations")):
-            if filename.endswith(".toml"):
-                self.bot.begging["locations"].append(
-                    utils.BeggingLocation.from_dict(
-                        self.bot,
-                        toml.load(os.path.join(directory, "locations", filename)),
-                        quotes_data,
-                    )
-                )
+    def _swap_registry(self, registry: utils.Registry) -> None:
+        """
+        Swaps in a new registry, and points cached inventories at its items.
+        """
 
-        # Load all donators
-        self.bot.begging["donators"] = utils.Donators.from_dict(
-            toml.load(os.path.join(directory, "donators.toml"))
-        )
+        # Swap the whole lot in at once. There's no await in here, so nothing can see the
+        # items from one registry and the begging config (or cached stacks) from another.
+        self.bot.registry = registry
+        self.bot.items = registry.items
+        self.bot.begging = registry.begging
+
+        # Cached inventories would otherwise keep showing the old names, emojis and recipes
+        for user in self.bot.user_cache.values():
+            if user.inventory is not None:
+                user.inventory.rebind(registry.items["all"])
+
+    @tasks.loop(seconds=5.0)
+    async def watch_config(self) -> None:
+        """
+        This task reloads the items and begging config whenever any of its files change.
+        """
+
+        signature = await self.bot.loop.run_in_executor(None, utils.config_signature)
+        current = getattr(self.bot, "registry", None)
+        if current is not None and signature == current.signature:
+            return
+        if signature == getattr(self, "_failed_config_signature", None):
+            return
+        await self.reload_registry()
 
     @vbu.Cog.listener(name="on_ready")
     async def _load_cache_on_ready(self):
@@ -103,62 +211,209 @@ class EconomyCommands(vbu.Cog):
         Cache some stuff when the bot is loaded.
         """
 
-        self._load_cache()
+        await self._load_cache()
+
+    @vbu.Cog.listener(name="on_guild_emojis_update")
+    async def _reload_registry_on_emojis_update(self, guild, before, after):
+        """
+        Build the registry again when any of the item and location emojis have changed, as
+        they're only looked up while it's being built. The config itself hasn't changed, so
+        it isn't loaded again, and the database doesn't need telling.
+        """
+
+        registry: typing.Optional[utils.Registry] = getattr(self.bot, "registry", None)
+        if registry is None:
+            return
+
+        # Emojis that were added, removed or renamed - anything else looks the same
+        old = {e.id: str(e) for e in before}
+        new = {e.id: str(e) for e in after}
+        changed = {i for i in old.keys() | new.keys() if old.get(i) != new.get(i)}
+        if registry.emoji_ids.isdisjoint(changed):
+            return
+
+        try:
+            registry = utils.Registry.build(
+                self.bot, self._registry_config, registry.signature
+            )
+        except Exception as e:
+            self.logger.error(f"Resolving emojis... failed - {e}")
+            return
+        self._swap_registry(registry)
+        self.logger.info(f"Resolving emojis... success - {len(changed)} emojis changed")
+
+    async def _replay_journal(self):
+        """
+        Writes any changes left in the user cache journal by the last run to the database,
+        then starts journaling again and lets users be loaded.
+        """
+
+        journal: utils.Journal = self.bot.user_cache.journal
+        newest, records = await self.bot.loop.run_in_executor(None, journal.read)
+
+        # Keep trying - if we let anyone load users before this is done, they'd get stale data
+        while records:
+            try:
+                async with vbu.DatabaseConnection() as db:
+                    written = await utils.replay_journal(db, records)
+                self.logger.info(
+                    f"Replaying user cache journal... success - {len(records)} records, {written} rows written"
+                )
+                break
+            except Exception as e:
+                self.logger.error(f"Replaying user cache journal... failed - {e}")
+                await asyncio.sleep(5)
+
+        await journal.truncate(newest)
+        journal.open()
+        self.bot.user_cache.mark_ready()
 
     def cog_unload(self):
-        self.update_db_from_user_cache.cancel()
+        if hasattr(self, "write_back"):
+            self.write_back.stop()
+        self.evict_idle_users.cancel()
+        self.watch_config.cancel()
+
+        # Save everyone's progress before we go
+        if hasattr(self.bot, "user_cache"):
+            self.bot.loop.create_task(self.drain())
+
+    async def drain(
+        self, *, shutdown: typing.Optional[bool] = False
+    ) -> typing.Tuple[int, float]:
+        """
+        Stops accepting economy commands, waits (up to `[user_cache] drain_timeout` seconds)
+        for running commands to finish, then writes every changed user to the database. Every
+        command that marks its user as busy is waited for, such as gambling, not just economy
+        ones - they can all change cached users.
+
+        Args:
+            shutdown (`bool`): Whether or not the bot is shutting down. If it isn't, economy
+                commands are accepted again once the drain is done.
+
+        Returns:
+            `tuple` of `int` and `float`: The number of users written and how long (in seconds)
+                writing them took.
+        """
+
+        self.bot.draining = True
+        timeout = self.bot.config.get("user_cache", {}).get("drain_timeout", 10.0)
+        self.logger.info(f"Draining user cache... waiting up to {timeout}s")
+
+        # Give running commands a chance to finish
+        if not await self.bot.commands_in_use.wait_idle(timeout):
+            self.logger.warn(
+                f"Draining user cache... {len(self.bot.commands_in_use)} commands still running after {timeout}s"
+            )
+
+        try:
+            start = time.perf_counter()
+            flushed = await self.flush_user_cache()
+            duration = time.perf_counter() - start
+            self.logger.info(
+                f"Draining user cache... success - {flushed} users written in {duration:.3f}s"
+            )
 
-    @tasks.loop(seconds=30.0)
-    async def update_db_from_user_cache(self) -> None:
+            # Anything still running will be replayed from the journal next time
+            if shutdown and self.bot.user_cache.journal is not None:
+                await self.bot.user_cache.journal.close()
+        finally:
+            if not shutdown:
+                self.bot.draining = False
+        return flushed, duration
+
+    async def flush_user_cache(self) -> int:
         """
-        This task updates the database from the user cache every minute.
+        Writes every changed user in the user cache to the database, as well as the L2 cache if
+        there is one. This won't be interrupted if the calling task is cancelled, and only one
+        flush runs at a time.
+
+        Returns:
+            `int`: The number of users written.
         """
 
-        self.logger.info("Updating database from user cache...")
+        return await asyncio.shield(self._flush_user_cache())
 
-        # Establish a connection to the database
-        async with vbu.DatabaseConnection() as db:
+    async def _flush_user_cache(self) -> int:
+        async with self.bot.user_cache.flush_lock:
+
+            # Everything journaled before now will be saved by this update
+            journal: typing.Optional[utils.Journal] = self.bot.user_cache.journal
+            sealed = journal.seal() if journal is not None else None
+
+            # Only bother with users that have changed since they were last written
+            dirty_users = self.bot.user_cache.dirty_users()
+            self.logger.info(
+                f"Updating database from user cache... {len(dirty_users)} changed users"
+            )
+            if not dirty_users:
+                return 0
 
-            # Iterate through all cached users (convert to list to avoid RuntimeError: dictionary changed size during iteration)
-            for user_id, user_cache in list(self.bot.user_cache.items()):
-
-                # Iterate through all of their skills
-                skill: utils.Skill
-                for skill in user_cache.skills:
-
-                    # Update the user's skill
-                    await db(
-                        """INSERT INTO user_skill VALUES ($1, $2, $3)
-                        ON CONFLICT (user_id, name) DO UPDATE SET
-                        experience = user_skill.experience""",
-                        user_id,
-                        skill.name,
-                        skill.experience,
+            # Write them all to the database, split up over a few connections
+            cache_config = self.bot.config.get("user_cache", {})
+            written: typing.List[utils.CachedUser] = []
+            try:
+                try:
+                    flushed = await utils.flush_user_caches_partitioned(
+                        dirty_users,
+                        concurrency=cache_config.get("flush_concurrency", 4),
+                        retries=cache_config.get("flush_retries", 2),
                     )
+                    written = dirty_users
+                except utils.PartialFlushError as e:
+                    written = e.written
+                    raise
+                finally:
+                    self.bot.user_cache.prune_dirty()
+                self.logger.info(
+                    f"Updating database from user cache... success - {flushed} users written"
+                )
 
-                    # Log our update
+                # The database is up to date, so the journal doesn't need to remember
+                # any of that
+                if journal is not None:
+                    truncated = await journal.truncate(sealed)
                     self.logger.info(
-                        f"Updating user cache for {user_id} - {skill.name!r}... success"
+                        f"Truncating user cache journal... success - {truncated} segments deleted"
                     )
+            finally:
+                # Whatever made it to the database has to reach the L2 cache too, or
+                # those users could never be evicted
+                await self._write_through_l2(written)
+            return flushed
 
-                # Update the user's pp
-                await db(
-                    """INSERT INTO user_pp VALUES ($1, $2, $3, $4)
-                    ON CONFLICT (user_id) DO UPDATE SET name = $2,
-                    size = $3, multiplier = $4""",
-                    user_id,
-                    user_cache.pp.name,
-                    user_cache.pp.size,
-                    user_cache.pp.multiplier,
-                )
+    async def _write_through_l2(self, users: typing.List[utils.CachedUser]) -> None:
+        """
+        Writes users that were just written to the database through to the L2 cache, if there
+        is one, so other processes don't load stale versions of them. If that fails, they're
+        removed from it instead.
+        """
 
-                # Log our update
-                self.logger.info(
-                    f"Updating user cache for {user_id}'s pp: {user_cache!r}... success"
-                )
+        l2 = self.bot.user_cache.l2
+        if l2 is None:
+            return
+        try:
+            written = await l2.put_many(users)
+            self.logger.info(
+                f"Updating L2 cache from user cache... success - {written} users written"
+            )
+        except Exception as e:
+            self.logger.error(f"Updating L2 cache from user cache... failed - {e}")
+            try:
+                await l2.forget_many(users)
+            except Exception as e:
+                self.logger.error(f"Removing stale users from L2 cache... failed - {e}")
+
+    @tasks.loop(seconds=60.0)
+    async def evict_idle_users(self) -> None:
+        """
+        This task drops users that nobody's used in a while from the user cache every minute.
+        """
 
-                if user_id not in self.bot.commands_in_use:
-                    del self.bot.user_cache[user_id]
+        evicted = self.bot.user_cache.evict_expired()
+        self.logger.info(
+            f"Evicting idle users from user cache... success - {evicted} evicted, {len(self.bot.user_cache)} cached, {self.write_back.queue_depth} waiting to be written"
+        )
 
     @commands.command(name="inventory", aliases=["inv"])
     @commands.bot_has_permissions(
@@ -174,115 +429,129 @@ class EconomyCommands(vbu.Cog):
     )
     @utils.is_slash_command()
     @utils.is_not_busy()
+    @utils.is_not_draining()
+    @utils.is_registry_loaded()
     @vbu.checks.bot_is_ready()
     async def _inventory_command(self, ctx: commands.SlashContext) -> None:
         """
         View the items in your inventory!
         """
 
-        async with vbu.DatabaseConnection() as db:
-            async with utils.Inventory.fetch(self.bot, db, ctx.author.id) as inventory:
+        await self.inventory_menu.start(ctx)
 
-                def formatter(menu, items: typing.List[utils.LootableItem]) -> str:
-                    with vbu.Embed() as embed:
-                        output = []
-                        for item in items:
-                            output.append(
-                                f"2x {item.emoji} **{item.name}** ─ {item.type.replace('_', ' ').title()}"
-                                + f"\n **{item.rarity.replace('_', ' ').title()}**"
-                                + f"  ─ `{item.id}` {item.description}"
-                            )
-                        embed.set_author(
-                            name=f"{ctx.author.display_name}'s inventory",
-                            icon_url=ctx.author.avatar.url,
-                        )
-                        embed.description = (
-                            f"use [/item-info [item]]({self.bot.hyperlink}) for more information.\n\n"
-                            + "\n\n".join(output)
-                        )
-                        embed.set_footer(
-                            f"Page {menu.current_page + 1}/{menu.max_pages}"
-                        )
-                    return embed
-
-                sorters = utils.Sorters(
-                    "ALPHABETICAL",
-                    utils.Sorter(
-                        "name (A ➞ Z)",
-                        "Sort items alphabetically",
-                        "ALPHABETICAL",
-                        lambda i: sorted(i, key=lambda x: x.name),
-                    ),
-                    utils.Sorter(
-                        "name (Z ➞ A)",
-                        "Sort items reverse-alphabetically",
-                        "REVERSE_ALPHABETICAL",
-                        lambda i: sorted(i, key=lambda x: x.name, reverse=True),
-                    ),
-                    utils.Sorter(
-                        "rarity (GODLIKE ➞ COMMON)",
-                        "Sort items based on their rarity from highest to lowest",
-                        "RARITY",
-                        lambda i: sorted(
-                            i,
-                            key=lambda x: {
-                                "ADMIN-ABUSE": 0,
-                                "GODLIKE": 1,
-                                "LEGENDARY": 2,
-                                "RARE": 3,
-                                "UNCOMMON": 4,
-                                "COMMON": 5,
-                            }[x.rarity],
-                        ),
-                    ),
-                    utils.Sorter(
-                        "rarity (COMMON ➞ GODLIKE)",
-                        "Sort items based on their rarity from lowest to highest",
-                        "REVERSE_RARITY",
-                        lambda i: sorted(
-                            i,
-                            key=lambda x: {
-                                "COMMON": 0,
-                                "UNCOMMON": 1,
-                                "RARE": 2,
-                                "LEGENDARY": 3,
-                                "GODLIKE": 4,
-                                "ADMIN-ABUSE": 5,
-                            }[x.rarity],
-                        ),
-                    ),
-                )
+    def _create_inventory_menu(self) -> utils.PersistentPaginator:
+        """
+        Creates the menu for the inventory command. Pages are fetched from the database,
+        sorted and filtered there, and shown by :meth:`_dispatch_menus`.
+        """
 
-                filters = utils.Filters(
-                    utils.Filter(
-                        "Crafting reagents",
-                        "CREATING_REAGENT",
-                        filterer=lambda i: list(
-                            filter(lambda x: x.type == "CRAFTING_REAGENT", i)
-                        ),
-                    ),
-                    utils.Filter(
-                        "Tools",
-                        "TOOL",
-                        filterer=lambda i: list(filter(lambda x: x.type == "TOOL", i)),
-                    ),
-                    utils.Filter(
-                        "Potions",
-                        "POTION",
-                        filterer=lambda i: list(
-                            filter(lambda x: x.type == "POTION", i)
-                        ),
-                    ),
+        def formatter(menu: utils.Paginator, items: typing.List[utils.LootableItem]):
+            with vbu.Embed() as embed:
+                output = []
+                for item in items:
+                    output.append(
+                        f"{item.amount}x {item.emoji} **{item.name}** ─ {item.type.replace('_', ' ').title()}"
+                        + f"\n **{item.rarity.replace('_', ' ').title()}**"
+                        + f"  ─ `{item.id}` {item.description}"
+                    )
+                embed.set_author(
+                    name=f"{menu.author.display_name}'s inventory",
+                    icon_url=menu.author.avatar.url,
+                )
+                embed.description = (
+                    f"use [/item-info [item]]({self.bot.hyperlink}) for more information.\n\n"
+                    + "\n\n".join(output)
                 )
+                embed.set_footer(
+                    f"Page {menu.current_page + 1}/{menu.max_pages}"
+                )
+            return embed
+
+        # The database does the sorting and filtering, so these are only labels and IDs
+        sorters = utils.Sorters(
+            "ALPHABETICAL",
+            utils.Sorter(
+                "name (A ➞ Z)",
+                "Sort items alphabetically",
+                "ALPHABETICAL",
+            ),
+            utils.Sorter(
+                "name (Z ➞ A)",
+                "Sort items reverse-alphabetically",
+                "REVERSE_ALPHABETICAL",
+            ),
+            utils.Sorter(
+                "rarity (GODLIKE ➞ COMMON)",
+                "Sort items based on their rarity from highest to lowest",
+                "RARITY",
+            ),
+            utils.Sorter(
+                "rarity (COMMON ➞ GODLIKE)",
+                "Sort items based on their rarity from lowest to highest",
+                "REVERSE_RARITY",
+            ),
+        )
 
-                paginator = utils.Paginator(
-                    inventory.items,
-                    per_page=5,
-                    formatter=formatter,
-                    sorters=sorters,
-                    filters=filters,
+        filters = utils.Filters(
+            utils.Filter("Crafting reagents", "CREATING_REAGENT"),
+            utils.Filter("Tools", "TOOL"),
+            utils.Filter("Potions", "POTION"),
+        )
+
+        # Only fetch the page that's being looked at, sorted and filtered by the database
+        return utils.PersistentPaginator(
+            "INVENTORY",
+            lambda user_id: utils.InventoryPageSource(
+                self.bot,
+                user_id,
+                types={
+                    "CREATING_REAGENT": "CRAFTING_REAGENT",
+                    "TOOL": "TOOL",
+                    "POTION": "POTION",
+                },
+            ),
+            per_page=5,
+            formatter=formatter,
+            sorters=sorters,
+            filters=filters,
+            before_page=self._save_inventory,
+        )
+
+    async def _save_inventory(self, user_id: int) -> None:
+        """
+        Writes a cached user's unsaved changes to the database, so that their inventory can be
+        paged through there.
+        """
+
+        if user_id not in self.bot.user_cache:
+            return
+        cache: utils.CachedUser = self.bot.user_cache[user_id]
+        if not cache.flushable:
+            return
+        async with self.bot.user_cache.flush_lock:
+            async with vbu.DatabaseConnection() as db:
+                await utils.flush_user_caches(db, [cache])
+            self.bot.user_cache.prune_dirty()
+
+            # The user's clean now, so no write back will do this for them
+            await self._write_through_l2([cache])
+
+    @vbu.Cog.listener(name="on_component_interaction")
+    async def _dispatch_menus(self, interaction: discord.Interaction) -> None:
+        """
+        Shows the page asked for when someone uses a persistent menu.
+        """
+
+        # Menus from before a restart can be used before there's anything to show in them
+        if getattr(self.bot, "registry", None) is None:
+            custom_id = str(interaction.component.custom_id)
+            if custom_id.startswith(f"{utils.PersistentPaginator.PREFIX}:"):
+                await interaction.response.send_message(
+                    "pp bot is still unpacking all of its items, try again in a few seconds",
+                    ephemeral=True,
                 )
-                await paginator.start(ctx, timeout=10)
+            return
+        await utils.PersistentPaginator.dispatch(interaction)
 
     @commands.command(name="show")
     @commands.bot_has_permissions(
@@ -298,6 +567,7 @@ class EconomyCommands(vbu.Cog):
     )
     @utils.is_slash_command()
     @utils.is_not_busy()
+    @utils.is_not_draining()
     @vbu.checks.bot_is_ready()
     async def _show_pp(self, ctx: commands.SlashContext) -> None:
         async with vbu.DatabaseConnection() as db:
@@ -331,6 +601,8 @@ class EconomyCommands(vbu.Cog):
     )
     @utils.is_slash_command()
     @utils.is_not_busy()
+    @utils.is_not_draining()
+    @utils.is_registry_loaded()
     @vbu.checks.bot_is_ready()
     async def _beg_command(self, ctx: commands.SlashContext) -> None:
         """
@@ -343,6 +615,7 @@ class EconomyCommands(vbu.Cog):
                 cache: utils.CachedUser = await utils.get_user_cache(
                     self, ctx.author.id, db
                 )
+                inventory = await cache.get_inventory(self.bot, db)
                 begging = cache.get_skill("BEGGING")
 
                 locations = utils.BeggingLocations(
@@ -458,17 +731,15 @@ class EconomyCommands(vbu.Cog):
                     with vbu.Embed() as embed:
                         embed.colour = utils.PINK
 
-                        # Generate rewards and give them to the user
-                        loot = location.loot_table.get_random_loot(
-                            self.bot, boosted=True
-                        )
-                        async with utils.Inventory.fetch(
-                            self.bot, db, ctx.author.id, update_values=True
-                        ) as inv:
-                            inv.add_items(*loot)
+                        # Generate rewards and give them to the user, saving them together
+                        with cache.atomic():
+                            loot = location.loot_table.get_random_loot(
+                                self.bot, boosted=True
+                            )
+                            inventory.add_items(*loot)
 
-                        growth = int(random.randint(1000, 2000) * cache.pp.multiplier)
-                        cache.pp.size += growth
+                            growth = int(random.randint(1000, 2000) * cache.pp.multiplier)
+                            cache.pp.size += growth
 
                         # Get a random quote and format it with the reward
                         quote = fill_in_the_blank.success.format(
@@ -568,17 +839,15 @@ class EconomyCommands(vbu.Cog):
                     with vbu.Embed() as embed:
                         embed.colour = utils.PINK
 
-                        # Generate rewards and give them to the user
-                        loot = location.loot_table.get_random_loot(
-                            self.bot, boosted=True
-                        )
-                        async with utils.Inventory.fetch(
-                            self.bot, db, ctx.author.id, update_values=True
-                        ) as inv:
-                            inv.add_items(*loot)
+                        # Generate rewards and give them to the user, saving them together
+                        with cache.atomic():
+                            loot = location.loot_table.get_random_loot(
+                                self.bot, boosted=True
+                            )
+                            inventory.add_items(*loot)
 
-                        growth = int(random.randint(1000, 2000) * cache.pp.multiplier)
-                        cache.pp.size += growth
+                            growth = int(random.randint(1000, 2000) * cache.pp.multiplier)
+                            cache.pp.size += growth
 
                         embed.description = f"**GG!** You win {utils.format_rewards(inches=growth, items=loot)}!"
 
@@ -657,17 +926,15 @@ class EconomyCommands(vbu.Cog):
                     with vbu.Embed() as embed:
                         embed.colour = utils.PINK
 
-                        # Generate rewards and give them to the user
-                        loot = location.loot_table.get_random_loot(
-                            self.bot, boosted=True
-                        )
-                        async with utils.Inventory.fetch(
-                            self.bot, db, ctx.author.id, update_values=True
-                        ) as inv:
-                            inv.add_items(*loot)
+                        # Generate rewards and give them to the user, saving them together
+                        with cache.atomic():
+                            loot = location.loot_table.get_random_loot(
+                                self.bot, boosted=True
+                            )
+                            inventory.add_items(*loot)
 
-                        growth = int(random.randint(1000, 2000) * cache.pp.multiplier)
-                        cache.pp.size += growth
+                            growth = int(random.randint(1000, 2000) * cache.pp.multiplier)
+                            cache.pp.size += growth
 
                         embed.description = f"**GG!** Nice typing skills bro, you win {utils.format_rewards(inches=growth, items=loot)}!"
 
@@ -683,15 +950,13 @@ class EconomyCommands(vbu.Cog):
                         donators: utils.Donators = self.bot.begging["donators"]
                         donator = donators.get_random_donator()
 
-                        # Generate rewards and give them to the user
-                        loot = location.loot_table.get_random_loot(self.bot)
-                        async with utils.Inventory.fetch(
-                            self.bot, db, ctx.author.id, update_values=True
-                        ) as inv:
-                            inv.add_items(*loot)
+                        # Generate rewards and give them to the user, saving them together
+                        with cache.atomic():
+                            loot = location.loot_table.get_random_loot(self.bot)
+                            inventory.add_items(*loot)
 
-                        growth = int(random.randint(1, 50) * cache.pp.multiplier)
-                        cache.pp.size += growth
+                            growth = int(random.randint(1, 50) * cache.pp.multiplier)
+                            cache.pp.size += growth
 
                         # If there are any donator success quotes, use them
                         if donator.quotes.success:
@@ -720,6 +985,92 @@ class EconomyCommands(vbu.Cog):
                         embed=embed, components=None, content=None
                     )
 
+    @commands.command(name="craft")
+    @commands.bot_has_permissions(
+        embed_links=True,
+        read_messages=True,
+        send_messages=True,
+        use_external_emojis=True,
+    )
+    @commands.has_permissions(
+        read_messages=True,
+        send_messages=True,
+        use_slash_commands=True,
+    )
+    @utils.is_slash_command()
+    @utils.is_not_busy()
+    @utils.is_not_draining()
+    @utils.is_registry_loaded()
+    @vbu.checks.bot_is_ready()
+    async def _craft_command(
+        self, ctx: commands.SlashContext, item: str, amount: int = 1
+    ) -> None:
+        """
+        Craft items out of the stuff in your inventory!
+        """
+
+        # Hold onto one registry, so a reload can't change the recipes mid-craft
+        registry: utils.Registry = self.bot.registry
+
+        # Let people use the item's name as well as its ID
+        crafted = registry.items["all"].get(item.strip().upper().replace(" ", "_"))
+        if crafted is None:
+            crafted = next(
+                (
+                    i
+                    for i in registry.items["all"].values()
+                    if i.name.lower() == item.strip().lower()
+                ),
+                None,
+            )
+        if crafted is None:
+            return await ctx.interaction.response.send_message(
+                content=f"There's no item called **{item}** lmao"
+            )
+        if crafted.id not in registry.crafting.recipes:
+            return await ctx.interaction.response.send_message(
+                content=f"You can't craft **{crafted.emoji} {crafted.name}**, you'll have to find it"
+            )
+
+        with utils.UsingCommand(ctx):
+            async with vbu.DatabaseConnection() as db:
+                cache: utils.CachedUser = await utils.get_user_cache(
+                    self, ctx.author.id, db
+                )
+                inventory = await cache.get_inventory(self.bot, db)
+
+            # Every ingredient is taken and every item is made in one go
+            try:
+                with cache.atomic():
+                    deltas = registry.crafting.craft(inventory, crafted.id, amount)
+            except utils.MissingIngredientsError as e:
+                craftable = registry.crafting.max_craftable(
+                    inventory.amounts(), crafted.id
+                )
+                missing = [
+                    utils.LootableItem(registry.items["all"][i], a)
+                    for i, a in e.missing.items()
+                ]
+                return await ctx.interaction.response.send_message(
+                    content=f"You need {utils.format_rewards(items=missing)} more to craft that. You can only craft **{craftable}** right now"
+                )
+            except utils.CraftingError as e:
+                return await ctx.interaction.response.send_message(content=str(e))
+
+            used = [
+                utils.LootableItem(registry.items["all"][i], -a)
+                for i, a in deltas.items()
+                if a < 0
+            ]
+            with vbu.Embed() as embed:
+                embed.colour = utils.GREEN
+                embed.set_author(
+                    name=f"{ctx.author.display_name}'s crafting",
+                    icon_url=ctx.author.avatar.url,
+                )
+                embed.description = f"You crafted {utils.format_rewards(items=[utils.LootableItem(crafted, amount)])} out of {utils.format_rewards(items=used)}"
+            await ctx.interaction.response.send_message(embed=embed)
+
 
 def setup(bot: vbu.Bot):
     x = EconomyCommands(bot)
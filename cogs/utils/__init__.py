@@ -1,4 +1,5 @@
 from .colours import *
+from .config_snapshot import *
 from .paginator import *
 from .item import *
 from .pp import *
@@ -8,12 +9,18 @@ from .skills import *
 from .inventory import *
 
 
-# ! Import cached_user after pp and skills
+# ! Import cached_user after pp, skills, inventory and journal
+from .journal import *
 from .cached_user import *
+from .write_back import *
 
 
 from .begging import *
+from .crafting import *
+from .registry import *
+from .inventory_pages import *
 from .readable import *
 from .gambling import *
+from .busy_registry import *
 from .checks import *
 from .using_command import *
@@ -1,2 +1,3 @@
 from .donator import *
 from .location import *
+from .compiled_loot_table import *
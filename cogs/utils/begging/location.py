@@ -48,6 +48,8 @@ class LootTable:
 
     Attributes:
         items (`list` of :class:`LootTableItem`): The items in the loot table.
+        compiled (:class:`CompiledLootTable`): The loot table compiled for rolling on, once
+            the items are loaded. Set by :class:`Registry`.
     """
 
     items: typing.List[LootTableItem]
@@ -58,6 +60,7 @@ class LootTable:
             items (`list` of :class:`LootTableItem`): The items in the loot table.
         """
         self.items = list(items)
+        self.compiled = None
 
     def get_random_loot(
         self,
@@ -77,6 +80,10 @@ class LootTable:
             typing.List[:class:`LootableItem`]: The random items with random amounts.
         """
 
+        # Use the compiled loot table if there is one - it's the same roll without the lookups
+        if self.compiled is not None:
+            return self.compiled.roll(max_items, boosted=boosted)
+
         # The maximum number of items will be the length of the loot table, unless max_items is specified.
         if max_items is None:
             max_items = len(self.items)
@@ -251,7 +258,8 @@ class BeggingLocation:
         id (`str` UPPER_SNAKE_CASE): (UPPER_SNAKE_CASE) The ID of the location.
         name (`str`): The name of the location. This will appeal as the label in a select menu.
         description (`str`): The description of the location. This will appear as the description in a select menu.
-        emoji (`str` or `discord.Emoji`): The emoji that will be used to represent the location. Can also be a custom emoji.
+        emoji_id (`int` or `str`): The custom ID of the emoji that will be used to represent the location, or the emoji itself.
+        emoji (`str`): The emoji that will be used to represent the location. Custom emojis are empty until :meth:`resolve_emoji` finds them.
         loot_table (:class:`LootTable`): The loot table for the location.
         quotes (:class:`Quotes`): The quotes for the location.
     """
@@ -260,7 +268,8 @@ class BeggingLocation:
     id: str
     name: str
     description: str
-    emoji: typing.Union[str, discord.Emoji]
+    emoji_id: typing.Union[int, str]
+    emoji: str
     loot_table: LootTable
     quotes: Quotes
 
@@ -271,7 +280,7 @@ class BeggingLocation:
         id: str,
         name: str,
         description: str,
-        emoji: typing.Union[str, int, discord.Emoji],
+        emoji: typing.Union[str, int],
         loot_table: LootTable,
         quotes: Quotes,
     ):
@@ -279,7 +288,8 @@ class BeggingLocation:
         self.id = id
         self.name = name
         self.description = description
-        self.emoji = bot.get_emoji(emoji) if isinstance(emoji, int) else emoji
+        self.emoji_id = emoji
+        self.emoji = "" if isinstance(emoji, int) else str(emoji)
         self.loot_table = loot_table
         self.quotes = quotes
 
@@ -299,9 +309,7 @@ class BeggingLocation:
             location_data["id"],
             location_data["name"],
             location_data["description"],
-            bot.get_emoji(location_data["emoji"])
-            if isinstance(location_data["emoji"], int)
-            else location_data["emoji"],
+            location_data["emoji"],
             LootTable(*(LootTableItem(**item) for item in location_data["loot_table"])),
             Quotes(
                 (location_data["quotes"]["success"] or []) + quotes_data["success"],
@@ -318,6 +326,24 @@ class BeggingLocation:
             ),
         )
 
+    def resolve_emoji(self, bot: vbu.Bot) -> bool:
+        """
+        Looks up the location's custom emoji, so :attr:`emoji` is ready to use. Emojis that
+        aren't custom don't need looking up.
+
+        Args:
+            bot (:class:`vbu.Bot`): The bot, with its emoji cache loaded.
+
+        Returns:
+            `bool`: Whether or not the emoji was found.
+        """
+
+        if not isinstance(self.emoji_id, int):
+            return True
+        emoji = bot.get_emoji(self.emoji_id)
+        self.emoji = str(emoji) if emoji is not None else ""
+        return emoji is not None
+
     @property
     def roman_numeral(self) -> str:
         """
@@ -348,7 +374,7 @@ class BeggingLocation:
             label=self.label,
             value=self.id,
             description=self.description,
-            emoji=self.emoji,
+            emoji=self.emoji or None,
         )
 
 
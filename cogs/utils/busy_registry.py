@@ -0,0 +1,167 @@
+import time
+import typing
+import asyncio
+import collections
+
+from discord.ext import commands
+
+
+__all__ = ("BusyRegistry",)
+
+
+class BusyRegistry:
+    """
+    Keeps track of which users are busy with a command, and which command that is.
+
+    Entries are removed as soon as the command finishes. If a command never finishes (such as
+    a coroutine that got dropped without running its cleanup), its entry expires after `ttl`
+    seconds instead of marking the user as busy forever. Every operation is O(1) - expired
+    entries are swept lazily, oldest first.
+
+    ::
+        token = bot.commands_in_use.acquire(ctx.author.id, ctx)
+        try:
+            ...
+        finally:
+            bot.commands_in_use.release(ctx.author.id, token)
+
+    Attributes:
+        ttl (`float`): How long (in seconds) an entry is kept if its command never finishes.
+        idle (:class:`asyncio.Event`): Set whenever nobody is busy with a command.
+    """
+
+    def __init__(self, *, ttl: typing.Optional[float] = 900.0):
+        """
+        Args:
+            ttl (`float`): How long (in seconds) an entry is kept if its command never finishes.
+        """
+
+        self.ttl = ttl
+
+        # user ID -> (expiry, token, context), soonest expiry first
+        self._entries: typing.OrderedDict[
+            int, typing.Tuple[float, object, commands.SlashContext]
+        ] = collections.OrderedDict()
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def _expire(self) -> None:
+        """
+        Removes expired entries. Entries all live for the same amount of time, so they expire
+        in the order they were added.
+        """
+
+        now = time.monotonic()
+        while self._entries:
+            user_id, (expiry, _, _) = next(iter(self._entries.items()))
+            if expiry > now:
+                break
+            del self._entries[user_id]
+        if not self._entries:
+            self.idle.set()
+
+    def acquire(self, user_id: int, ctx: commands.SlashContext) -> object:
+        """
+        Marks a user as busy with a command.
+
+        Args:
+            user_id (`int`): The user's ID.
+            ctx (:class:`discord.ext.commands.SlashContext`): The command's context.
+
+        Returns:
+            `object`: A token to pass to :meth:`release` once the command is done.
+        """
+
+        self._expire()
+        token = object()
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = (time.monotonic() + self.ttl, token, ctx)
+        self.idle.clear()
+        return token
+
+    def release(self, user_id: int, token: object) -> None:
+        """
+        Marks a user as no longer busy. Nothing happens if their entry has already expired and
+        been replaced by a newer command.
+
+        Args:
+            user_id (`int`): The user's ID.
+            token (`object`): The token from :meth:`acquire`.
+        """
+
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] is token:
+            del self._entries[user_id]
+            if not self._entries:
+                self.idle.set()
+
+    def get(self, user_id: int) -> typing.Optional[commands.SlashContext]:
+        """
+        Gets the command a user is busy with.
+
+        Args:
+            user_id (`int`): The user's ID.
+
+        Returns:
+            :class:`discord.ext.commands.SlashContext`: The command's context, or `None` if
+                the user isn't busy.
+        """
+
+        self._expire()
+        entry = self._entries.get(user_id)
+        return entry[2] if entry is not None else None
+
+    def is_active(self, user_id: int) -> bool:
+        """
+        Whether or not a user is busy with a command.
+
+        Args:
+            user_id (`int`): The user's ID.
+        """
+
+        return self.get(user_id) is not None
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.is_active(user_id)
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._entries)
+
+    def values(self) -> typing.List[commands.SlashContext]:
+        """
+        Returns a list of the contexts of the commands that are running.
+        """
+
+        self._expire()
+        return [ctx for _, _, ctx in self._entries.values()]
+
+    async def wait_idle(self, timeout: typing.Optional[float] = None) -> bool:
+        """
+        :coro: Waits until nobody is busy with a command, or until `timeout` seconds have
+        passed. Entries that expire while waiting stop counting as they expire.
+
+        Args:
+            timeout (`float`): The longest (in seconds) to wait, or `None` to wait forever.
+
+        Returns:
+            `bool`: Whether or not everyone finished in time.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._expire()
+            if not self._entries:
+                return True
+
+            # Wake up when the oldest entry expires, in case its command never finishes
+            now = time.monotonic()
+            wait = next(iter(self._entries.values()))[0] - now
+            if deadline is not None:
+                if deadline <= now:
+                    return False
+                wait = min(wait, deadline - now)
+            try:
+                await asyncio.wait_for(self.idle.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
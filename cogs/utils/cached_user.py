@@ -1,12 +1,89 @@
+import json
+import time
+import zlib
 import typing
+import asyncio
+import itertools
+import contextlib
+import collections
 from dataclasses import dataclass
 
 from discord.ext import vbu
 
-from . import Pp, Skill
+from . import Pp, Skill, Inventory, Journal
 
 
-__all__ = ("CachedUser", "get_user_cache")
+__all__ = (
+    "CachedUser",
+    "CachedUserSnapshot",
+    "UserCache",
+    "get_user_cache",
+    "get_user_caches",
+    "flush_user_caches",
+    "flush_user_caches_partitioned",
+    "PartialFlushError",
+    "replay_journal",
+    "dump_cached_user",
+    "load_cached_user",
+    "MemoryUserCacheL2",
+    "RedisUserCacheL2",
+)
+
+
+@dataclass(frozen=True)
+class PpSnapshot:
+    """
+    A frozen copy of a :class:`Pp`, as part of a :class:`CachedUserSnapshot`.
+    """
+
+    name: str
+    size: int
+    multiplier: float
+    version: int
+
+
+@dataclass(frozen=True)
+class SkillSnapshot:
+    """
+    A frozen copy of a :class:`Skill`, as part of a :class:`CachedUserSnapshot`.
+    """
+
+    name: str
+    experience: int
+    version: int
+
+
+@dataclass(frozen=True)
+class InventorySnapshot:
+    """
+    A frozen copy of an :class:`Inventory`'s unsaved deltas, and the amounts of the items
+    they're for, as part of a :class:`CachedUserSnapshot`.
+    """
+
+    deltas: typing.Tuple[typing.Tuple[str, int], ...]
+    amounts: typing.Tuple[typing.Tuple[str, int], ...]
+    version: int
+
+
+@dataclass(frozen=True)
+class CachedUserSnapshot:
+    """
+    A frozen copy of a :class:`CachedUser`, taken with :meth:`CachedUser.snapshot`.
+
+    Attributes:
+        user_id (`int`): The user's ID.
+        version (`int`): The user's version when the snapshot was taken.
+        pp (:class:`PpSnapshot`): The user's pp.
+        skills (`tuple` of :class:`SkillSnapshot`): The user's skills.
+        inventory (:class:`InventorySnapshot`): The user's inventory, or `None` if it wasn't
+            loaded.
+    """
+
+    user_id: int
+    version: int
+    pp: PpSnapshot
+    skills: typing.Tuple[SkillSnapshot, ...]
+    inventory: typing.Optional[InventorySnapshot] = None
 
 
 @dataclass
@@ -18,13 +95,22 @@ class CachedUser:
         user_id (int): The user's ID.
         skills (`list` of `:class:Pp`):  The user's cached skills.
         pp (`:class:Pp`):  The user's cached pp.
+        inventory (`:class:Inventory`):  The user's cached inventory, or `None` if it hasn't
+            been loaded yet. See :meth:`get_inventory`.
     """
 
     user_id: int
     skills: typing.List[Skill]
     pp: Pp
 
-    def __init__(self, user_id: int, skills: typing.List[Skill], pp: Pp):
+    def __init__(
+        self,
+        user_id: int,
+        skills: typing.List[Skill],
+        pp: Pp,
+        *,
+        version: typing.Optional[int] = 0,
+    ):
         """
         Represents a cached user.
 
@@ -32,11 +118,185 @@ class CachedUser:
             user_id (int): The user's ID.
             skills (`list` of `:class:Pp`):  The user's cached skills.
             pp (`:class:Pp`):  The user's cached pp.
+            version (`int`): The version the user was loaded at. Only users loaded from the
+                shared L2 cache have a version other than 0.
         """
 
         self.user_id = user_id
         self.skills = skills
         self.pp = pp
+        self.base_version = version
+
+        # The inventory is only loaded when a command needs it
+        self.inventory: typing.Optional[Inventory] = None
+        self._inventory_loading: typing.Optional[asyncio.Future] = None
+
+        # The version last written to the L2 cache, or `None` if we've never written one
+        self.l2_version: typing.Optional[int] = None
+
+        # A function that gets called with the pp, skill or inventory whenever one of them changes
+        self.observer: typing.Optional[
+            typing.Callable[[typing.Union[Pp, Skill, Inventory]], None]
+        ] = None
+        self.pp.observer = self._on_change
+        for skill in self.skills:
+            skill.observer = self._on_change
+
+        # How many atomic blocks are open, the snapshot from before the outermost one, and the
+        # pp/skills/inventory changed inside them (keyed by ID, since they aren't hashable)
+        self._atomic_depth = 0
+        self._atomic_snapshot: typing.Optional[CachedUserSnapshot] = None
+        self._atomic_changes: typing.Dict[int, typing.Union[Pp, Skill, Inventory]] = {}
+
+    @property
+    def version(self) -> int:
+        """
+        (`int`) The user's version. This goes up every time the user's pp, skills or inventory
+        change.
+        """
+
+        return (
+            self.base_version
+            + self.pp.version
+            + sum(skill.version for skill in self.skills)
+            + (self.inventory.version if self.inventory is not None else 0)
+        )
+
+    @property
+    def dirty(self) -> bool:
+        """
+        (`bool`) Whether or not the user's pp, inventory or any of their skills have changed
+        since they were last written to the database.
+        """
+
+        return (
+            self.pp.dirty
+            or any(skill.dirty for skill in self.skills)
+            or (self.inventory is not None and self.inventory.dirty)
+        )
+
+    @property
+    def flushable(self) -> bool:
+        """
+        (`bool`) Whether or not the user's :meth:`snapshot` has anything that hasn't been written
+        to the database yet. This is only different to :attr:`dirty` inside an :meth:`atomic`
+        block.
+        """
+
+        if self._atomic_snapshot is None:
+            return self.dirty
+        snapshot = self._atomic_snapshot
+        if snapshot.pp.version > self.pp.flushed_version:
+            return True
+        if (
+            snapshot.inventory is not None
+            and snapshot.inventory.version > self.inventory.flushed_version
+        ):
+            return True
+        skills = {skill.name: skill for skill in self.skills}
+        return any(
+            skill.version > skills[skill.name].flushed_version
+            for skill in snapshot.skills
+        )
+
+    def observe(
+        self,
+        observer: typing.Optional[
+            typing.Callable[[typing.Union[Pp, Skill, Inventory]], None]
+        ],
+    ) -> None:
+        """
+        Sets a function to be called with the user's pp, skill or inventory whenever one of
+        them changes.
+        Changes made inside an :meth:`atomic` block are only passed on once the block ends.
+
+        Args:
+            observer (`callable`): The function, or `None` to stop observing the user.
+        """
+
+        self.observer = observer
+
+    def _on_change(self, obj: typing.Union[Pp, Skill, Inventory]) -> None:
+        if self._atomic_depth:
+            self._atomic_changes[id(obj)] = obj
+        elif self.observer is not None:
+            self.observer(obj)
+
+    def snapshot(self) -> CachedUserSnapshot:
+        """
+        Takes a frozen copy of the user. Inside an :meth:`atomic` block, this is the user as it
+        was before the block started.
+
+        Returns:
+            :class:`CachedUserSnapshot`: The snapshot.
+        """
+
+        if self._atomic_snapshot is not None:
+            return self._atomic_snapshot
+        return CachedUserSnapshot(
+            self.user_id,
+            self.version,
+            PpSnapshot(self.pp.name, self.pp.size, self.pp.multiplier, self.pp.version),
+            tuple(
+                SkillSnapshot(skill.name, skill.experience, skill.version)
+                for skill in self.skills
+            ),
+            (
+                InventorySnapshot(
+                    tuple(self.inventory.deltas.items()),
+                    tuple(self.inventory.changed_amounts().items()),
+                    self.inventory.version,
+                )
+                if self.inventory is not None
+                else None
+            ),
+        )
+
+    @contextlib.contextmanager
+    def atomic(self):
+        """
+        Groups changes to the user that have to be saved together, such as taking a bet and
+        paying it out. Until the block ends, :meth:`snapshot` (and so the database, the L2 cache
+        and the journal) only see the user as they were before it started. The block can span
+        awaits, and blocks can be nested. Changes aren't rolled back if the block raises.
+
+        ::
+            with cache.atomic():
+                cache.pp.size -= amount
+                await play_game()
+                cache.pp.size += reward
+        """
+
+        if not self._atomic_depth:
+            self._atomic_snapshot = self.snapshot()
+        self._atomic_depth += 1
+        try:
+            yield self
+        finally:
+            self._atomic_depth -= 1
+            if not self._atomic_depth:
+                self._atomic_snapshot = None
+                changes, self._atomic_changes = self._atomic_changes, {}
+                for obj in changes.values():
+                    self._on_change(obj)
+
+    def mark_flushed(self, snapshot: CachedUserSnapshot) -> None:
+        """
+        Marks the user as written to the database, as of a snapshot. Anything changed since
+        the snapshot was taken is still unsaved.
+
+        Args:
+            snapshot (:class:`CachedUserSnapshot`): The snapshot that was written.
+        """
+
+        self.pp.mark_flushed(snapshot.pp.version)
+        if snapshot.inventory is not None:
+            self.inventory.mark_flushed(
+                snapshot.inventory.version, dict(snapshot.inventory.deltas)
+            )
+        skills = {skill.name: skill for skill in self.skills}
+        for skill in snapshot.skills:
+            skills[skill.name].mark_flushed(skill.version)
 
     def get_skill(self, name: str) -> Skill:
         """
@@ -56,10 +316,475 @@ class CachedUser:
             skill = None
         if skill is None:
             skill = Skill(self.user_id, name=name)
+            skill.observer = self._on_change
             self.skills.append(skill)
             return skill
         return skill
 
+    async def get_inventory(
+        self, bot: vbu.Bot, db: vbu.DatabaseConnection
+    ) -> Inventory:
+        """
+        :coro: Gets the user's inventory, loading it from the database the first time it's
+        needed. Changes to it are written back along with the rest of the user.
+
+        Args:
+            bot (:class:`vbu.Bot`): The bot which has the items cached.
+            db (:class:`voxelbotutils.DatabaseConnection`): The database connection.
+
+        Returns:
+            `:class:Inventory`:  The user's inventory.
+        """
+
+        if self.inventory is not None:
+            return self.inventory
+
+        # Someone's already loading it, so let's wait for them
+        if self._inventory_loading is not None:
+            return await asyncio.shield(self._inventory_loading)
+
+        loading = self._inventory_loading = asyncio.get_event_loop().create_future()
+        try:
+            rows = await db(
+                "SELECT item_id, amount FROM user_inv WHERE user_id = $1", self.user_id
+            )
+            inventory = Inventory.from_rows(bot, self.user_id, rows)
+            inventory.observer = self._on_change
+        except asyncio.CancelledError:
+            loading.cancel()
+            raise
+        except Exception as e:
+            loading.set_exception(e)
+            loading.exception()  # Stop asyncio complaining if nobody else was waiting
+            raise
+        finally:
+            self._inventory_loading = None
+
+        self.inventory = inventory
+        loading.set_result(inventory)
+        return inventory
+
+
+class UserCache:
+    """
+    A bounded cache of :class:`CachedUser`s, keyed by user ID.
+
+    Users are kept in least-recently-used order. Once the cache holds more than `max_size`
+    users, or a user hasn't been touched for `ttl` seconds, the user becomes a candidate for
+    eviction. Users that are busy with a command, or that have changes which haven't been
+    written to the database yet, are never evicted. If there's an L2 cache, users whose L2 entry
+    is older than their cached state aren't evicted either, as they'd be reloaded from it.
+
+    Attributes:
+        max_size (`int`): The maximum number of users to keep cached.
+        ttl (`float`): How long (in seconds) an idle user is kept cached.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_size: typing.Optional[int] = 10_000,
+        ttl: typing.Optional[float] = 600.0,
+        is_in_use: typing.Optional[typing.Callable[[int], bool]] = None,
+        l2: typing.Optional["MemoryUserCacheL2"] = None,
+        journal: typing.Optional[Journal] = None,
+    ):
+        """
+        Args:
+            max_size (`int`): The maximum number of users to keep cached.
+            ttl (`float`): How long (in seconds) an idle user is kept cached.
+            is_in_use (`callable`): A function taking a user ID that returns whether or not
+                the user is currently busy with a command.
+            l2 (:class:`MemoryUserCacheL2` or :class:`RedisUserCacheL2`): A cache shared between
+                processes, which is checked before the database when loading users.
+            journal (:class:`Journal`): A journal that every change to a cached user is appended
+                to. If given, no users will be loaded until :meth:`mark_ready` is called, so
+                that the journal can be replayed first.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.l2 = l2
+        self.journal = journal
+        self._ready = asyncio.Event()
+        if journal is None:
+            self._ready.set()
+
+        # Held while writing users to the database, so only one write happens at a time
+        self.flush_lock = asyncio.Lock()
+
+        # user ID -> when the user first got unsaved changes, oldest first
+        self._dirty_since: typing.OrderedDict[int, float] = collections.OrderedDict()
+
+        # A function that gets called whenever a user gets unsaved changes
+        self.dirty_listener: typing.Optional[typing.Callable[[], None]] = None
+        self._is_in_use = is_in_use or (lambda user_id: False)
+
+        # user ID -> (last used, cached user), least recently used first
+        self._users: typing.OrderedDict[
+            int, typing.Tuple[float, CachedUser]
+        ] = collections.OrderedDict()
+
+        # user ID -> the user being loaded from the database
+        self._loading: typing.Dict[int, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._users)
+
+    def __getitem__(self, user_id: int) -> CachedUser:
+        _, user = self._users[user_id]
+        self._touch(user_id, user)
+        return user
+
+    def __setitem__(self, user_id: int, user: CachedUser) -> None:
+        user.observe(self._on_change)
+        self._touch(user_id, user)
+        self._evict_overflow()
+
+    def __delitem__(self, user_id: int) -> None:
+        _, user = self._users.pop(user_id)
+        self._dirty_since.pop(user_id, None)
+        user.observe(None)
+
+    def _on_change(self, obj: typing.Union[Pp, Skill, Inventory]) -> None:
+        """
+        Records when a user first got unsaved changes, and appends the changed pp, skill or
+        inventory to the journal.
+        """
+
+        if obj.user_id not in self._dirty_since:
+            self._dirty_since[obj.user_id] = time.monotonic()
+            if self.dirty_listener is not None:
+                self.dirty_listener()
+
+        if self.journal is None:
+            return
+        if isinstance(obj, Pp):
+            self.journal.append(["pp", obj.user_id, obj.name, obj.size, obj.multiplier])
+        elif isinstance(obj, Inventory):
+            self.journal.append(["inv", obj.user_id, obj.changed_amounts()])
+        else:
+            self.journal.append(["skill", obj.user_id, obj.name, obj.experience])
+
+    def mark_ready(self) -> None:
+        """
+        Allows users to be loaded into the cache, once the journal has been replayed.
+        """
+
+        self._ready.set()
+
+    async def get_or_load(
+        self,
+        user_id: int,
+        loader: typing.Callable[
+            [typing.List[int]], typing.Awaitable[typing.Dict[int, CachedUser]]
+        ],
+    ) -> CachedUser:
+        """
+        :coro: Returns a cached user, loading and caching them if they aren't cached yet.
+        See :meth:`get_or_load_many`.
+
+        Args:
+            user_id (`int`): The user's ID.
+            loader (`callable`): A coroutine function taking a list of user IDs and returning
+                the loaded users, keyed by user ID.
+
+        Returns:
+            :class:`CachedUser`: The cached user.
+        """
+
+        return (await self.get_or_load_many([user_id], loader))[user_id]
+
+    async def get_or_load_many(
+        self,
+        user_ids: typing.Iterable[int],
+        loader: typing.Callable[
+            [typing.List[int]], typing.Awaitable[typing.Dict[int, CachedUser]]
+        ],
+    ) -> typing.Dict[int, CachedUser]:
+        """
+        :coro: Returns cached users, loading and caching any that aren't cached yet with a
+        single call to `loader`. Users that are already being loaded by someone else aren't
+        loaded again - we wait for that load instead, so every caller gets the same
+        :class:`CachedUser` instance.
+
+        Args:
+            user_ids (`iterable` of `int`): The users' IDs.
+            loader (`callable`): A coroutine function taking a list of user IDs and returning
+                the loaded users, keyed by user ID.
+
+        Returns:
+            `dict`: The cached users, keyed by user ID, in the order they were asked for.
+        """
+
+        await self._ready.wait()
+        user_ids = list(dict.fromkeys(user_ids))
+        users: typing.Dict[int, CachedUser] = {}
+        waiting: typing.Dict[int, asyncio.Future] = {}
+        missing: typing.List[int] = []
+
+        for user_id in user_ids:
+            try:
+                users[user_id] = self[user_id]
+            except KeyError:
+
+                # Someone's already loading this user, so let's wait for them
+                if user_id in self._loading:
+                    waiting[user_id] = self._loading[user_id]
+                else:
+                    missing.append(user_id)
+
+        if missing:
+            loop = asyncio.get_event_loop()
+            futures = {user_id: loop.create_future() for user_id in missing}
+            self._loading.update(futures)
+            try:
+                loaded = await loader(missing)
+            except asyncio.CancelledError:
+                for future in futures.values():
+                    future.cancel()
+                raise
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()  # Stop asyncio complaining if nobody else was waiting
+                raise
+            finally:
+                for user_id in missing:
+                    del self._loading[user_id]
+
+            # Cache the whole batch before evicting anyone, so nobody in it gets evicted
+            # before the caller even sees them
+            for user_id, future in futures.items():
+                user = loaded[user_id]
+                user.observe(self._on_change)
+                self._touch(user_id, user)
+                future.set_result(user)
+                users[user_id] = user
+            self._evict_overflow(exclude=futures.keys())
+
+        for user_id, future in waiting.items():
+            users[user_id] = await asyncio.shield(future)
+
+        return {user_id: users[user_id] for user_id in user_ids}
+
+    def get(
+        self, user_id: int, default: typing.Optional[CachedUser] = None
+    ) -> typing.Optional[CachedUser]:
+        try:
+            return self[user_id]
+        except KeyError:
+            return default
+
+    def items(self) -> typing.List[typing.Tuple[int, CachedUser]]:
+        """
+        Returns a list of (user ID, cached user) pairs without touching them.
+        """
+
+        return [(user_id, user) for user_id, (_, user) in self._users.items()]
+
+    def values(self) -> typing.List[CachedUser]:
+        """
+        Returns a list of the cached users without touching them.
+        """
+
+        return [user for _, user in self._users.values()]
+
+    @property
+    def dirty_count(self) -> int:
+        """
+        (`int`) The number of cached users with changes that haven't been written to the database.
+        """
+
+        return len(self._dirty_since)
+
+    @property
+    def oldest_dirty_since(self) -> typing.Optional[float]:
+        """
+        (`float`) The :func:`time.monotonic` time at which the user that's gone the longest
+        without being written to the database first got unsaved changes, or `None` if there
+        are no such users.
+        """
+
+        return next(iter(self._dirty_since.values()), None)
+
+    def dirty_users(self) -> typing.List[CachedUser]:
+        """
+        Returns a list of the cached users with changes that haven't been written to the database,
+        oldest changes first.
+        """
+
+        self.prune_dirty()
+        return [self._users[user_id][1] for user_id in self._dirty_since]
+
+    def prune_dirty(self) -> None:
+        """
+        Forgets about users that no longer have any unsaved changes that can be written. Call
+        this after writing users to the database.
+        """
+
+        for user_id in list(self._dirty_since):
+            try:
+                _, user = self._users[user_id]
+            except KeyError:
+                user = None
+            # Users whose only changes are inside an atomic block are added back once it ends
+            if user is None or not user.flushable:
+                del self._dirty_since[user_id]
+
+    def _touch(self, user_id: int, user: CachedUser) -> None:
+        """
+        Marks a user as most recently used.
+        """
+
+        self._users[user_id] = (time.monotonic(), user)
+        self._users.move_to_end(user_id)
+
+    def is_evictable(self, user_id: int) -> bool:
+        """
+        Whether or not a user can safely be removed from the cache.
+
+        Args:
+            user_id (`int`): The user's ID.
+        """
+
+        _, user = self._users[user_id]
+        if user.dirty or self._is_in_use(user_id):
+            return False
+        return user.l2_version is None or user.l2_version >= user.version
+
+    def _evict_overflow(self, exclude: typing.Container[int] = ()) -> int:
+        """
+        Evicts the least recently used users until the cache fits within `max_size`.
+
+        Args:
+            exclude (`container` of `int`): The IDs of users that mustn't be evicted.
+        """
+
+        if self.max_size is None or len(self._users) <= self.max_size:
+            return 0
+        overflow = len(self._users) - self.max_size
+
+        # Users are ordered by last use, so stop as soon as enough have been found
+        evicted = list(
+            itertools.islice(
+                (
+                    user_id
+                    for user_id in self._users
+                    if user_id not in exclude and self.is_evictable(user_id)
+                ),
+                overflow,
+            )
+        )
+        for user_id in evicted:
+            del self[user_id]
+        return len(evicted)
+
+    def evict_expired(self) -> int:
+        """
+        Evicts every user that hasn't been used within `ttl` seconds, as well as any
+        users over `max_size`.
+
+        Returns:
+            `int`: The number of users evicted.
+        """
+
+        evicted = 0
+        if self.ttl is not None:
+            expiry = time.monotonic() - self.ttl
+            expired = []
+            for user_id, (last_used, _) in self._users.items():
+
+                # Users are ordered by last use, so everyone after this is still fresh
+                if last_used > expiry:
+                    break
+                if self.is_evictable(user_id):
+                    expired.append(user_id)
+            for user_id in expired:
+                del self[user_id]
+            evicted += len(expired)
+        return evicted + self._evict_overflow()
+
+
+_LOAD_USERS_SQL = """
+SELECT u.user_id, p.name, p.size, p.multiplier,
+    s.names AS skill_names, s.experiences AS skill_experiences
+FROM unnest($1::BIGINT[]) AS u (user_id)
+LEFT JOIN user_pp p ON p.user_id = u.user_id
+LEFT JOIN LATERAL (
+    SELECT array_agg(name) AS names, array_agg(experience) AS experiences
+    FROM user_skill WHERE user_skill.user_id = u.user_id
+) s ON TRUE
+"""
+
+
+async def _load_users(
+    db: vbu.DatabaseConnection, user_ids: typing.List[int]
+) -> typing.Dict[int, CachedUser]:
+    """
+    :coro: Loads users' pps and skills from the database in a single query.
+
+    Args:
+        db (:class:`voxelbotutils.DatabaseConnection`): The database connection.
+        user_ids (`list` of `int`): The IDs of the users to load.
+
+    Returns:
+        `dict`: The loaded users, keyed by user ID.
+    """
+
+    users = {}
+    for row in await db(_LOAD_USERS_SQL, user_ids):
+        user_id = row["user_id"]
+
+        # apparently the user doesn't have pp? Let's create one
+        if row["size"] is None:
+            user_pp = Pp(user_id)
+        else:
+            user_pp = Pp(user_id, row["name"], row["size"], row["multiplier"])
+
+        user_skills = [
+            Skill(user_id, name, experience)
+            for name, experience in zip(
+                row["skill_names"] or [], row["skill_experiences"] or []
+            )
+        ]
+        users[user_id] = CachedUser(user_id, user_skills, user_pp)
+    return users
+
+
+async def _fetch_users(
+    cog: vbu.Cog, db: vbu.DatabaseConnection, user_ids: typing.List[int]
+) -> typing.Dict[int, CachedUser]:
+    """
+    :coro: Loads users from the L2 cache, if there is one, and the rest from the database.
+    Users loaded from the database are then added to the L2 cache for other processes to use.
+    """
+
+    l2: typing.Optional[MemoryUserCacheL2] = cog.bot.user_cache.l2
+    users = {}
+    if l2 is not None:
+        try:
+            users = await l2.get_many(user_ids)
+        except Exception as e:
+            cog.logger.error(f"Getting users from L2 cache... failed - {e}")
+
+    missing = [i for i in user_ids if i not in users]
+    if missing:
+        loaded = await _load_users(db, missing)
+        users.update(loaded)
+        if l2 is not None:
+            try:
+                await l2.put_many(loaded.values())
+            except Exception as e:
+                cog.logger.error(f"Adding users to L2 cache... failed - {e}")
+    return users
+
 
 async def get_user_cache(
     cog: vbu.Cog, user_id: int, db: typing.Optional[vbu.DatabaseConnection]
@@ -76,33 +801,564 @@ async def get_user_cache(
         :class:`UserCache`: The user's cache.
     """
 
-    # If the user is already cached, return it
-    try:
-        return cog.bot.user_cache[user_id]
+    async def loader(user_ids: typing.List[int]) -> typing.Dict[int, CachedUser]:
+        users = await _fetch_users(cog, db, user_ids)
+
+        # we do a little logging. it's called: "We do a little logging"
+        cog.logger.info(f"Creating user cache for {user_id}... success")
+        return users
+
+    return await cog.bot.user_cache.get_or_load(user_id, loader)
+
+
+async def get_user_caches(
+    cog: vbu.Cog,
+    user_ids: typing.Iterable[int],
+    db: typing.Optional[vbu.DatabaseConnection],
+) -> typing.Dict[int, CachedUser]:
+    """
+    :coro: Returns multiple users' cached information. Users that are already cached are
+    returned straight from the cache, and all of the others are loaded from the database with
+    a single query.
+
+    Args:
+        cog (`:class:vbu.Cog`):  The cog.
+        user_ids (`iterable` of `int`): The users' IDs.
+        db (:class:`voxelbotutils.DatabaseConnection`): The database connection.
+
+    Returns:
+        `dict`: The users' caches, keyed by user ID, in the order they were asked for.
+    """
+
+    async def loader(user_ids: typing.List[int]) -> typing.Dict[int, CachedUser]:
+        users = await _fetch_users(cog, db, user_ids)
+        cog.logger.info(f"Creating user cache for {len(users)} users... success")
+        return users
+
+    return await cog.bot.user_cache.get_or_load_many(user_ids, loader)
+
+
+_UPSERT_PPS_SQL = """
+INSERT INTO user_pp (user_id, name, size, multiplier)
+SELECT * FROM unnest($1::BIGINT[], $2::TEXT[], $3::BIGINT[], $4::FLOAT[])
+ON CONFLICT (user_id) DO UPDATE SET name = excluded.name,
+size = excluded.size, multiplier = excluded.multiplier
+"""
+
+
+_UPSERT_SKILLS_SQL = """
+INSERT INTO user_skill (user_id, name, experience)
+SELECT * FROM unnest($1::BIGINT[], $2::TEXT[], $3::BIGINT[])
+ON CONFLICT (user_id, name) DO UPDATE SET experience = excluded.experience
+"""
+
+
+# Inventories are written as deltas, so only the items that changed are touched
+_ADD_INVENTORIES_SQL = """
+INSERT INTO user_inv (user_id, item_id, amount)
+SELECT * FROM unnest($1::BIGINT[], $2::TEXT[], $3::INT[])
+ON CONFLICT (user_id, item_id) DO UPDATE SET amount = user_inv.amount + excluded.amount
+"""
+
+
+# The journal holds whole amounts rather than deltas, so replaying it twice is harmless
+_UPSERT_INVENTORIES_SQL = """
+INSERT INTO user_inv (user_id, item_id, amount)
+SELECT * FROM unnest($1::BIGINT[], $2::TEXT[], $3::INT[])
+ON CONFLICT (user_id, item_id) DO UPDATE SET amount = excluded.amount
+"""
 
-    # Otherwise, let's create it
-    except KeyError:
 
-        # Get the user's skills
-        user_skill_rows = await db(
-            "SELECT * FROM user_skill WHERE user_id = $1", user_id
+# Items that run out are deleted once their change has been written
+_DELETE_EMPTY_INVENTORIES_SQL = """
+DELETE FROM user_inv USING unnest($1::BIGINT[], $2::TEXT[]) AS t (user_id, item_id)
+WHERE user_inv.user_id = t.user_id AND user_inv.item_id = t.item_id
+AND user_inv.amount <= 0
+"""
+
+
+async def flush_user_caches(
+    db: vbu.DatabaseConnection,
+    users: typing.Iterable[CachedUser],
+    *,
+    absolute: typing.Optional[bool] = False,
+) -> int:
+    """
+    :coro: Writes the changed pps, skills and inventories of the given users to the database.
+    All of the pps, all of the skills and all of the inventory deltas are each sent as a single
+    set-based upsert, inside one transaction. Only the inventory items that changed are written,
+    and items that run out are deleted.
+
+    Args:
+        db (:class:`voxelbotutils.DatabaseConnection`): The database connection.
+        users (`iterable` of :class:`CachedUser`): The users to write. Users without any
+            changes are skipped.
+        absolute (`bool`): Whether to write the changed inventory items' whole amounts instead
+            of their deltas. Use this when retrying a write that might have been committed
+            without us hearing about it, so the deltas aren't added twice.
+
+    Returns:
+        `int`: The number of users written to the database.
+    """
+
+    pp_rows = []
+    skill_rows = []
+    inventory_rows = []
+
+    # The users we're writing, along with the snapshot of them we're writing. Commands can
+    # keep changing users while we wait on the database - they'll just be written next time.
+    flushed: typing.List[typing.Tuple[CachedUser, CachedUserSnapshot]] = []
+
+    for user in users:
+        snapshot = user.snapshot()
+        written = False
+        if snapshot.pp.version > user.pp.flushed_version:
+            pp_rows.append(
+                (user.user_id, snapshot.pp.name, snapshot.pp.size, snapshot.pp.multiplier)
+            )
+            written = True
+        skills = {skill.name: skill for skill in user.skills}
+        for skill in snapshot.skills:
+            if skill.version > skills[skill.name].flushed_version:
+                skill_rows.append((user.user_id, skill.name, skill.experience))
+                written = True
+        if (
+            snapshot.inventory is not None
+            and snapshot.inventory.version > user.inventory.flushed_version
+        ):
+            if absolute:
+                inventory_rows.extend(
+                    (user.user_id, item_id, amount)
+                    for item_id, amount in snapshot.inventory.amounts
+                )
+            else:
+                inventory_rows.extend(
+                    (user.user_id, item_id, delta)
+                    for item_id, delta in snapshot.inventory.deltas
+                    if delta
+                )
+            written = True
+        if written:
+            flushed.append((user, snapshot))
+
+    if not flushed:
+        return 0
+
+    async with db.conn.transaction():
+        if pp_rows:
+            await db(_UPSERT_PPS_SQL, *[list(column) for column in zip(*pp_rows)])
+        if skill_rows:
+            await db(
+                _UPSERT_SKILLS_SQL, *[list(column) for column in zip(*skill_rows)]
+            )
+        if inventory_rows:
+            columns = [list(column) for column in zip(*inventory_rows)]
+            await db(
+                _UPSERT_INVENTORIES_SQL if absolute else _ADD_INVENTORIES_SQL, *columns
+            )
+            await db(_DELETE_EMPTY_INVENTORIES_SQL, *columns[:2])
+
+    # Only mark things as flushed once the transaction has been committed
+    for user, snapshot in flushed:
+        user.mark_flushed(snapshot)
+    return len(flushed)
+
+
+def _partition(user_id: int, partitions: int) -> int:
+    """
+    Picks a partition for a user. User IDs are snowflakes, whose low bits are mostly a counter,
+    so they're hashed rather than taken modulo the number of partitions.
+    """
+
+    return zlib.crc32(user_id.to_bytes(8, "little")) % partitions
+
+
+class PartialFlushError(Exception):
+    """
+    Raised by :func:`flush_user_caches_partitioned` when a partition still fails after all of
+    its retries. The partitions that succeeded have already been committed and marked as
+    flushed, so they're kept here for anything that needs to follow up on them.
+
+    Attributes:
+        error (`Exception`): The error from the first partition that failed.
+        written (`list` of :class:`CachedUser`): The users in the partitions that were written.
+        flushed (`int`): The number of users written.
+    """
+
+    def __init__(
+        self, error: Exception, written: typing.List[CachedUser], flushed: int
+    ):
+        self.error = error
+        self.written = written
+        self.flushed = flushed
+        super().__init__(str(error))
+
+
+async def flush_user_caches_partitioned(
+    users: typing.Iterable[CachedUser],
+    *,
+    concurrency: typing.Optional[int] = 4,
+    retries: typing.Optional[int] = 2,
+) -> int:
+    """
+    :coro: Writes the changed pps, skills and inventories of the given users to the database,
+    split into `concurrency` partitions by user ID. Each partition is written with
+    :func:`flush_user_caches` on its own pooled connection, in its own transaction, and all of
+    the partitions are written at the same time. Partitions that fail are retried, without
+    redoing the ones that succeeded. A failed partition might still have been committed, so
+    retries write whole inventory amounts rather than deltas.
+
+    Args:
+        users (`iterable` of :class:`CachedUser`): The users to write.
+        concurrency (`int`): How many partitions (and database connections) to use. This
+            shouldn't be more than the size of the database pool.
+        retries (`int`): How many times to retry a partition that fails.
+
+    Returns:
+        `int`: The number of users written.
+
+    Raises:
+        :class:`PartialFlushError`: If a partition still failed after all of its retries.
+            Every other partition is still written.
+    """
+
+    partitions: typing.Dict[int, typing.List[CachedUser]] = {}
+    for user in users:
+        if user.flushable:
+            partitions.setdefault(_partition(user.user_id, concurrency), []).append(
+                user
+            )
+
+    async def flush_partition(
+        partition: typing.List[CachedUser], absolute: bool
+    ) -> int:
+        async with vbu.DatabaseConnection() as db:
+            return await flush_user_caches(db, partition, absolute=absolute)
+
+    flushed = 0
+    written: typing.List[CachedUser] = []
+    pending = list(partitions.values())
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(0.5 * attempt)
+        results = await asyncio.gather(
+            *[flush_partition(i, bool(attempt)) for i in pending],
+            return_exceptions=True,
         )
-        user_skills = [Skill(**i) for i in user_skill_rows]
+        failed = []
+        for partition, result in zip(pending, results):
+            if isinstance(result, BaseException):
+                failed.append((partition, result))
+            else:
+                flushed += result
+                written.extend(partition)
+        if not failed:
+            return flushed
+        pending = [partition for partition, _ in failed]
+    raise PartialFlushError(failed[0][1], written, flushed) from failed[0][1]
 
-        # Now let's get the user's pp
-        try:
-            pp_rows = await db("SELECT * FROM user_pp WHERE user_id = $1", user_id)
-            user_pp = Pp(**pp_rows[0])
 
-        # apparently the user doesn't have pp? Let's create one
-        except IndexError:
-            user_pp = Pp(user_id)
+async def replay_journal(
+    db: vbu.DatabaseConnection, records: typing.Iterable[list]
+) -> int:
+    """
+    :coro: Writes the pps, skills and inventories recorded in a user cache :class:`Journal` to
+    the database, in one transaction. Records hold whole values rather than changes, so only
+    the newest record for each pp, skill or inventory item is written, and replaying the same
+    records twice is harmless.
 
-        # Now we add this to the user cache
-        cog.bot.user_cache[user_id] = CachedUser(user_id, user_skills, user_pp)
+    Args:
+        db (:class:`voxelbotutils.DatabaseConnection`): The database connection.
+        records (`iterable` of `list`): The records, oldest first.
 
-        # we do a little logging. it's called: "We do a little logging"
-        cog.logger.info(f"Creating user cache for {user_id}... success")
+    Returns:
+        `int`: The number of rows written.
+    """
+
+    pps: typing.Dict[int, tuple] = {}
+    skills: typing.Dict[typing.Tuple[int, str], tuple] = {}
+    inventory_items: typing.Dict[typing.Tuple[int, str], tuple] = {}
+    for record in records:
+        if record[0] == "pp":
+            pps[record[1]] = tuple(record[1:])
+        elif record[0] == "skill":
+            skills[(record[1], record[2])] = tuple(record[1:])
+        elif record[0] == "inv":
+            for item_id, amount in record[2].items():
+                inventory_items[(record[1], item_id)] = (record[1], item_id, amount)
+
+    async with db.conn.transaction():
+        if pps:
+            await db(
+                _UPSERT_PPS_SQL, *[list(column) for column in zip(*pps.values())]
+            )
+        if skills:
+            await db(
+                _UPSERT_SKILLS_SQL, *[list(column) for column in zip(*skills.values())]
+            )
+        if inventory_items:
+            columns = [list(column) for column in zip(*inventory_items.values())]
+            await db(_UPSERT_INVENTORIES_SQL, *columns)
+            await db(_DELETE_EMPTY_INVENTORIES_SQL, *columns[:2])
+    return len(pps) + len(skills) + len(inventory_items)
+
+
+def dump_cached_user(
+    user: typing.Union[CachedUser, CachedUserSnapshot]
+) -> str:
+    """
+    Serializes a user for the L2 cache, in the form `version|[name, size, multiplier, skills]`.
+    The version comes first so it can be compared without decoding the rest.
+
+    Args:
+        user (:class:`CachedUser` or :class:`CachedUserSnapshot`): The user to serialize.
+            Cached users are serialized as of their :meth:`CachedUser.snapshot`.
+
+    Returns:
+        `str`: The serialized user.
+    """
+
+    if isinstance(user, CachedUser):
+        user = user.snapshot()
+    return "{}|{}".format(
+        user.version,
+        json.dumps(
+            [
+                user.pp.name,
+                user.pp.size,
+                user.pp.multiplier,
+                [[skill.name, skill.experience] for skill in user.skills],
+            ],
+            separators=(",", ":"),
+        ),
+    )
+
+
+def load_cached_user(user_id: int, data: typing.Union[str, bytes]) -> CachedUser:
+    """
+    Deserializes a user from the L2 cache.
+
+    Args:
+        user_id (`int`): The user's ID.
+        data (`str`): The serialized user, from :func:`dump_cached_user`.
+
+    Returns:
+        :class:`CachedUser`: The user.
+    """
+
+    if isinstance(data, bytes):
+        data = data.decode()
+    version, payload = data.split("|", 1)
+    name, size, multiplier, skills = json.loads(payload)
+    user = CachedUser(
+        user_id,
+        [Skill(user_id, skill, experience) for skill, experience in skills],
+        Pp(user_id, name, size, multiplier),
+        version=int(version),
+    )
+    user.l2_version = user.version
+    return user
+
+
+class MemoryUserCacheL2:
+    """
+    An in-memory L2 user cache. This behaves exactly like :class:`RedisUserCacheL2`, but only
+    lives within the current process, so it can be used without a Redis server.
+
+    Attributes:
+        ttl (`float`): How long (in seconds) an entry is kept after it was last written.
+    """
+
+    def __init__(self, *, ttl: typing.Optional[float] = 3600.0):
+        """
+        Args:
+            ttl (`float`): How long (in seconds) an entry is kept after it was last written.
+        """
+
+        self.ttl = ttl
+
+        # user ID -> (expiry, serialized user)
+        self._entries: typing.Dict[int, typing.Tuple[float, str]] = {}
+
+    async def get_many(
+        self, user_ids: typing.Iterable[int]
+    ) -> typing.Dict[int, CachedUser]:
+        """
+        :coro: Gets users from the cache.
+
+        Args:
+            user_ids (`iterable` of `int`): The users' IDs.
+
+        Returns:
+            `dict`: The users that were cached, keyed by user ID.
+        """
+
+        now = time.monotonic()
+        users = {}
+        for user_id in user_ids:
+            try:
+                expiry, data = self._entries[user_id]
+            except KeyError:
+                continue
+            if expiry <= now:
+                del self._entries[user_id]
+                continue
+            users[user_id] = load_cached_user(user_id, data)
+        return users
+
+    async def put_many(self, users: typing.Iterable[CachedUser]) -> int:
+        """
+        :coro: Writes users to the cache, as of their :meth:`CachedUser.snapshot`. A user is
+        only written if the cache doesn't already hold a newer version of them.
+
+        Args:
+            users (`iterable` of :class:`CachedUser`): The users to write.
+
+        Returns:
+            `int`: The number of users written.
+        """
+
+        now = time.monotonic()
+        written = 0
+        for user in users:
+            snapshot = user.snapshot()
+            version = snapshot.version
+            try:
+                expiry, data = self._entries[user.user_id]
+                current = int(data.split("|", 1)[0]) if expiry > now else -1
+            except KeyError:
+                current = -1
+            if current < version:
+                self._entries[user.user_id] = (
+                    now + self.ttl,
+                    dump_cached_user(snapshot),
+                )
+                written += 1
+            user.l2_version = version
+        return written
+
+    async def forget_many(self, users: typing.Iterable[CachedUser]) -> None:
+        """
+        :coro: Removes users from the cache.
+
+        Args:
+            users (`iterable` of :class:`CachedUser`): The users to remove.
+        """
+
+        for user in users:
+            self._entries.pop(user.user_id, None)
+            user.l2_version = None
+
+
+class RedisUserCacheL2:
+    """
+    An L2 user cache stored in Redis, and shared between all of the bot's processes.
+
+    Attributes:
+        ttl (`float`): How long (in seconds) an entry is kept after it was last written.
+        prefix (`str`): The prefix for the cache's keys.
+    """
+
+    # Only overwrite an entry if it's missing, or older than the version we're writing
+    _PUT_SCRIPT = """
+    local written = {}
+    for i, key in ipairs(KEYS) do
+        local version = tonumber(ARGV[i * 2])
+        local current = redis.call('GET', key)
+        if (not current) or tonumber(string.match(current, '^(%d+)|')) < version then
+            redis.call('SET', key, ARGV[i * 2 + 1], 'EX', ARGV[1])
+            written[i] = 1
+        else
+            written[i] = 0
+        end
+    end
+    return written
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: typing.Optional[float] = 3600.0,
+        prefix: typing.Optional[str] = "ppbot:user:",
+    ):
+        """
+        Args:
+            ttl (`float`): How long (in seconds) an entry is kept after it was last written.
+            prefix (`str`): The prefix for the cache's keys.
+        """
+
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def get_many(
+        self, user_ids: typing.Iterable[int]
+    ) -> typing.Dict[int, CachedUser]:
+        """
+        :coro: Gets users from the cache.
+
+        Args:
+            user_ids (`iterable` of `int`): The users' IDs.
+
+        Returns:
+            `dict`: The users that were cached, keyed by user ID.
+        """
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        async with vbu.Redis() as re:
+            values = await re.conn.mget(*[self._key(i) for i in user_ids])
+        return {
+            user_id: load_cached_user(user_id, data)
+            for user_id, data in zip(user_ids, values)
+            if data is not None
+        }
+
+    async def put_many(self, users: typing.Iterable[CachedUser]) -> int:
+        """
+        :coro: Writes users to the cache, as of their :meth:`CachedUser.snapshot`. A user is
+        only written if the cache doesn't already hold a newer version of them.
+
+        Args:
+            users (`iterable` of :class:`CachedUser`): The users to write.
+
+        Returns:
+            `int`: The number of users written.
+        """
+
+        users = list(users)
+        if not users:
+            return 0
+        keys = []
+        args = [int(self.ttl)]
+        versions = []
+        for user in users:
+            snapshot = user.snapshot()
+            version = snapshot.version
+            keys.append(self._key(user.user_id))
+            args.extend((version, dump_cached_user(snapshot)))
+            versions.append(version)
+        async with vbu.Redis() as re:
+            written = await re.conn.eval(self._PUT_SCRIPT, keys=keys, args=args)
+        for user, version in zip(users, versions):
+            user.l2_version = version
+        return sum(written)
+
+    async def forget_many(self, users: typing.Iterable[CachedUser]) -> None:
+        """
+        :coro: Removes users from the cache.
+
+        Args:
+            users (`iterable` of :class:`CachedUser`): The users to remove.
+        """
 
-        # and return the user cache
-        return cog.bot.user_cache[user_id]
+        users = list(users)
+        if not users:
+            return
+        async with vbu.Redis() as re:
+            await re.conn.delete(*[self._key(user.user_id) for user in users])
+        for user in users:
+            user.l2_version = None
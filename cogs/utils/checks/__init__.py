@@ -1,2 +1,4 @@
 from .is_slash_command import *
 from .is_not_busy import *
+from .is_not_draining import *
+from .is_registry_loaded import *
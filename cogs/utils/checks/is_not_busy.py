@@ -10,7 +10,7 @@ class IsBusy(commands.CheckFailure):
 
     def __init__(self, ctx: commands.SlashContext) -> None:
         self.ctx = ctx
-        self.command_ctx = self.ctx.bot.commands_in_use[ctx.author.id]
+        self.command_ctx = self.ctx.bot.commands_in_use.get(ctx.author.id)
         super().__init__(
             f"You're already busy with `/{self.command_ctx.command.name}`, slow down bruv"
         )
@@ -19,14 +19,14 @@ class IsBusy(commands.CheckFailure):
 def is_not_busy():
     """
     The check for whether or not the author is busy with another command (as
-    defined by `ctx.author.id` having a :class:`discord.ext.commands.SlashContext` linked to it in :dict:`ctx.bot.commands_in_use`).
+    defined by `ctx.author.id` being active in :class:`utils.BusyRegistry` :attr:`ctx.bot.commands_in_use`).
 
     Raises:
         `IsBusy`: If the author is busy with another command.
     """
 
     async def predicate(ctx: commands.SlashContext) -> bool:
-        if ctx.bot.commands_in_use.get(ctx.author.id, None):
+        if ctx.bot.commands_in_use.is_active(ctx.author.id):
             raise IsBusy(ctx)
         return True
 
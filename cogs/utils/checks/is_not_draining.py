@@ -0,0 +1,31 @@
+from discord.ext import commands
+
+
+class IsDraining(commands.CheckFailure):
+    """
+    The generic error for the bot failing the :func:`utils.checks.is_not_draining` check.
+    """
+
+    def __init__(self, ctx: commands.SlashContext) -> None:
+        self.ctx = ctx
+        super().__init__(
+            "pp bot is saving everyone's pp real quick, try again in a few seconds"
+        )
+
+
+def is_not_draining():
+    """
+    The check for whether or not the bot is accepting economy commands (as defined by
+    :attr:`ctx.bot.draining` being falsy). The bot drains when the economy cog is unloaded
+    or the bot is shutting down, so that everyone's progress can be saved.
+
+    Raises:
+        `IsDraining`: If the bot is draining.
+    """
+
+    async def predicate(ctx: commands.SlashContext) -> bool:
+        if getattr(ctx.bot, "draining", False):
+            raise IsDraining(ctx)
+        return True
+
+    return commands.check(predicate)
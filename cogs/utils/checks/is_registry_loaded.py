@@ -0,0 +1,31 @@
+from discord.ext import commands
+
+
+class IsRegistryNotLoaded(commands.CheckFailure):
+    """
+    The generic error for the bot failing the :func:`utils.checks.is_registry_loaded` check.
+    """
+
+    def __init__(self, ctx: commands.SlashContext) -> None:
+        self.ctx = ctx
+        super().__init__(
+            "pp bot is still unpacking all of its items, try again in a few seconds"
+        )
+
+
+def is_registry_loaded():
+    """
+    The check for whether or not the items and begging config have been loaded (as defined by
+    :attr:`ctx.bot.registry` existing). The config is loaded in the background once the bot is
+    ready, so commands can come in before it's there.
+
+    Raises:
+        `IsRegistryNotLoaded`: If the config hasn't been loaded yet.
+    """
+
+    async def predicate(ctx: commands.SlashContext) -> bool:
+        if getattr(ctx.bot, "registry", None) is None:
+            raise IsRegistryNotLoaded(ctx)
+        return True
+
+    return commands.check(predicate)
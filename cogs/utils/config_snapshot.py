@@ -0,0 +1,191 @@
+"""
+Compiles the item and begging TOML under `config/` into a single snapshot file, so the bot
+doesn't have to parse every file again each time it starts.
+
+The snapshot holds the parsed contents of each file along with a hash of the file, and is
+only trusted for files whose hash still matches. Files that changed (or were added) are parsed
+again and the snapshot is rewritten, so an out-of-date snapshot is never worse than no
+snapshot at all. To build the snapshot ahead of time (e.g. when deploying):
+
+    python -m cogs.utils.config_snapshot
+"""
+
+import hashlib
+import os
+import pathlib
+import pickle
+import tempfile
+import typing
+
+import toml
+
+
+__all__ = (
+    "CONFIG_DIRECTORY",
+    "CONFIG_SNAPSHOT_PATH",
+    "config_signature",
+    "load_config",
+)
+
+
+CONFIG_DIRECTORY = pathlib.Path(__file__).resolve().parents[2] / "config"
+CONFIG_SNAPSHOT_PATH = CONFIG_DIRECTORY / "config.snapshot"
+
+# Bump this whenever the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+
+
+def _source_files(directory: pathlib.Path) -> typing.Dict[str, pathlib.Path]:
+    """
+    Returns the TOML files that make up the config, keyed by their path relative to
+    `directory` (always with forward slashes, so snapshots work on any platform).
+    """
+
+    paths = [
+        *sorted((directory / "items").glob("*.toml")),
+        *sorted((directory / "begging" / "locations").glob("*.toml")),
+        directory / "begging" / "quotes.toml",
+        directory / "begging" / "donators.toml",
+    ]
+    return {path.relative_to(directory).as_posix(): path for path in paths}
+
+
+def _plain(data: typing.Any) -> typing.Any:
+    """
+    Copies parsed TOML into plain dicts and lists. toml parses inline tables into a class that
+    can't be pickled, so this has to happen before anything goes into a snapshot.
+    """
+
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    return data
+
+
+def _read_snapshot(
+    snapshot_path: pathlib.Path,
+) -> typing.Dict[str, typing.Tuple[str, dict]]:
+    """
+    Reads the files from a snapshot, keyed by relative path, as (hash, parsed data) pairs.
+    A missing, unreadable or outdated snapshot has no files.
+    """
+
+    try:
+        with snapshot_path.open("rb") as f:
+            snapshot = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return {}
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return {}
+    return snapshot["files"]
+
+
+def _write_snapshot(
+    snapshot_path: pathlib.Path, files: typing.Dict[str, typing.Tuple[str, dict]]
+) -> None:
+    """
+    Writes a snapshot, replacing the old one in a single step so a crash can't leave half of
+    one behind.
+    """
+
+    fd, temp_path = tempfile.mkstemp(dir=snapshot_path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(
+                {"version": SNAPSHOT_VERSION, "files": files},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(temp_path, snapshot_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def config_signature(
+    directory: typing.Optional[pathlib.Path] = CONFIG_DIRECTORY,
+) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """
+    Gets a cheap signature of the config files - their modification times and sizes - that
+    changes whenever a file is edited, added or removed. Nothing is read or parsed, so this can
+    be polled to find out when the config needs loading again.
+
+    Args:
+        directory (:class:`pathlib.Path`): The config directory.
+
+    Returns:
+        `dict`: The `(mtime_ns, size)` of each file, keyed by its relative path.
+    """
+
+    signature = {}
+    for name, path in _source_files(pathlib.Path(directory)).items():
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # Being replaced mid-edit - the next poll will pick it up
+        signature[name] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+def load_config(
+    directory: typing.Optional[pathlib.Path] = CONFIG_DIRECTORY,
+    snapshot_path: typing.Optional[pathlib.Path] = CONFIG_SNAPSHOT_PATH,
+) -> typing.Tuple[dict, int]:
+    """
+    Loads the item and begging config, using the snapshot for any file that hasn't changed
+    since it was taken. If any file had to be parsed, the snapshot is rewritten. This blocks,
+    so it should be run in an executor if the event loop is running.
+
+    Args:
+        directory (:class:`pathlib.Path`): The config directory.
+        snapshot_path (:class:`pathlib.Path`): The snapshot file.
+
+    Returns:
+        `tuple` of `dict` and `int`: The config - a dict with `items` and `locations` (lists of
+            parsed files), and `quotes` and `donators` (parsed files) - and how many files had
+            to be parsed.
+    """
+
+    directory = pathlib.Path(directory)
+    snapshot_path = pathlib.Path(snapshot_path)
+    cached = _read_snapshot(snapshot_path)
+
+    files: typing.Dict[str, typing.Tuple[str, dict]] = {}
+    parsed = 0
+    for name, path in _source_files(directory).items():
+        raw = path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        try:
+            cached_digest, data = cached[name]
+        except KeyError:
+            cached_digest = None
+        if cached_digest != digest:
+            data = _plain(toml.loads(raw.decode("utf-8")))
+            parsed += 1
+        files[name] = (digest, data)
+
+    # Removed files need dropping from the snapshot too
+    if parsed or files.keys() != cached.keys():
+        try:
+            _write_snapshot(snapshot_path, files)
+        except Exception:
+            pass  # The config's loaded either way, it just won't load any faster next time
+
+    return {
+        "items": [
+            data for name, (_, data) in files.items() if name.startswith("items/")
+        ],
+        "locations": [
+            data
+            for name, (_, data) in files.items()
+            if name.startswith("begging/locations/")
+        ],
+        "quotes": files["begging/quotes.toml"][1],
+        "donators": files["begging/donators.toml"][1],
+    }, parsed
+
+
+if __name__ == "__main__":
+    _, parsed = load_config()
+    print(f"Compiled {CONFIG_SNAPSHOT_PATH} ({parsed} files parsed)")
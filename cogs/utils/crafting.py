@@ -0,0 +1,284 @@
+import types
+import typing
+
+from . import Item, LootableItem
+from .inventory import Inventory
+
+
+__all__ = (
+    "CraftingError",
+    "RecipeCycleError",
+    "MissingIngredientsError",
+    "CraftingGraph",
+)
+
+
+class CraftingError(ValueError):
+    """
+    Raised when something can't be crafted.
+    """
+
+
+class RecipeCycleError(CraftingError):
+    """
+    Raised when the recipes go round in a circle, such as an item that's crafted from itself.
+
+    Attributes:
+        cycle (`list` of `str`): The IDs of the items in the cycle, starting and ending with
+            the same item.
+    """
+
+    def __init__(self, cycle: typing.List[str]):
+        self.cycle = cycle
+        super().__init__(f"Recipes go round in a circle: {' ➞ '.join(cycle)}")
+
+
+class MissingIngredientsError(CraftingError):
+    """
+    Raised when an inventory doesn't have enough ingredients to craft something.
+
+    Attributes:
+        missing (`dict` of `str`: `int`): How many more of each uncraftable ingredient are
+            needed, keyed by item ID.
+    """
+
+    def __init__(self, missing: typing.Dict[str, int]):
+        self.missing = missing
+        super().__init__(
+            "Missing " + ", ".join(f"{a}x {i}" for i, a in missing.items())
+        )
+
+
+class CraftingGraph:
+    """
+    The recipes of every item, compiled into a graph when the :class:`Registry` is built.
+
+    Working out a craft walks the item's ingredients (and their ingredients, and so on) once
+    each, products before ingredients, so every ingredient knows exactly how many of it are
+    needed before deciding whether to take them from the inventory or craft them. Ingredients
+    the inventory doesn't have enough of are crafted too, if they have a recipe.
+
+    Attributes:
+        items (`dict`): Every item, keyed by ID.
+        recipes (`dict`): The ingredients of each craftable item, keyed by item ID, as a
+            `tuple` of `(item ID, amount)` pairs.
+        order (`tuple` of `str`): Every item ID, with ingredients before the items they're
+            used to craft.
+    """
+
+    __slots__ = ("items", "recipes", "order", "_plans")
+
+    def __init__(self, items: typing.Mapping[str, Item]):
+        """
+        Args:
+            items (`dict`): Every item, keyed by ID. Recipes must only use items in here.
+
+        Raises:
+            :class:`RecipeCycleError`: If any item ends up being crafted from itself.
+        """
+
+        recipes = {
+            item.id: tuple((r.id, r.amount) for r in item.recipe)
+            for item in items.values()
+            if item.recipe
+        }
+        order = self._sort(items, recipes)
+        position = {item_id: i for i, item_id in enumerate(order)}
+
+        # Everything each item is crafted from, products first, so a craft only walks
+        # the part of the graph it needs
+        plans: typing.Dict[str, typing.Tuple[str, ...]] = {}
+        for item_id in order:
+            needed = {item_id}
+            for ingredient, _ in recipes.get(item_id, ()):
+                needed.update(plans[ingredient])
+            plans[item_id] = tuple(sorted(needed, key=position.get, reverse=True))
+
+        object.__setattr__(self, "items", items)
+        object.__setattr__(self, "recipes", types.MappingProxyType(recipes))
+        object.__setattr__(self, "order", order)
+        object.__setattr__(self, "_plans", plans)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    @staticmethod
+    def _sort(
+        items: typing.Mapping[str, Item],
+        recipes: typing.Mapping[str, typing.Tuple[typing.Tuple[str, int], ...]],
+    ) -> typing.Tuple[str, ...]:
+        """
+        Sorts the items so ingredients come before the items they're used to craft.
+
+        Raises:
+            :class:`RecipeCycleError`: If any item ends up being crafted from itself.
+        """
+
+        order: typing.List[str] = []
+        done: typing.Set[str] = set()
+        path: typing.List[str] = []
+        on_path: typing.Set[str] = set()
+
+        # Depth first, without recursion so a long chain of recipes can't overflow the stack
+        for root in items:
+            if root in done:
+                continue
+            stack = [(root, iter(recipes.get(root, ())))]
+            path.append(root)
+            on_path.add(root)
+            while stack:
+                item_id, ingredients = stack[-1]
+                for ingredient, _ in ingredients:
+                    if ingredient in on_path:
+                        raise RecipeCycleError(
+                            path[path.index(ingredient) :] + [ingredient]
+                        )
+                    if ingredient not in done:
+                        stack.append((ingredient, iter(recipes.get(ingredient, ()))))
+                        path.append(ingredient)
+                        on_path.add(ingredient)
+                        break
+                else:
+                    stack.pop()
+                    path.pop()
+                    on_path.discard(item_id)
+                    done.add(item_id)
+                    order.append(item_id)
+
+        return tuple(order)
+
+    def _resolve(
+        self, amounts: typing.Mapping[str, int], item_id: str, amount: int
+    ) -> typing.Tuple[typing.Dict[str, int], typing.Dict[str, int]]:
+        """
+        Works out how to craft `amount` of an item, using as much as possible from the
+        inventory before crafting anything.
+
+        Returns:
+            `tuple` of `dict` and `dict`: How much each item's amount changes, and how many
+                more of each uncraftable ingredient are needed, both keyed by item ID.
+        """
+
+        needed = {item_id: amount}
+        deltas: typing.Dict[str, int] = {item_id: amount}
+        missing: typing.Dict[str, int] = {}
+
+        for current in self._plans[item_id]:
+            need = needed.pop(current, 0)
+            if not need:
+                continue
+
+            # The item being crafted is always crafted, never taken from the inventory
+            if current != item_id:
+                used = min(need, max(amounts.get(current, 0), 0))
+                if used:
+                    deltas[current] = -used
+                need -= used
+                if not need:
+                    continue
+
+            try:
+                recipe = self.recipes[current]
+            except KeyError:
+                missing[current] = need
+                continue
+            for ingredient, per_craft in recipe:
+                needed[ingredient] = needed.get(ingredient, 0) + need * per_craft
+
+        return deltas, missing
+
+    def plan(
+        self, amounts: typing.Mapping[str, int], item_id: str, amount: int = 1
+    ) -> typing.Dict[str, int]:
+        """
+        Works out how an inventory's amounts change to craft an item, crafting any
+        ingredients it doesn't have enough of along the way.
+
+        Args:
+            amounts (`dict` of `str`: `int`): How many of each item the inventory has.
+            item_id (`str`): The ID of the item to craft.
+            amount (`int`): How many of the item to craft.
+
+        Returns:
+            `dict` of `str`: `int`: How much each item's amount changes, keyed by item ID.
+
+        Raises:
+            :class:`CraftingError`: If the item can't be crafted.
+            :class:`MissingIngredientsError`: If there aren't enough ingredients.
+        """
+
+        if item_id not in self.recipes:
+            raise CraftingError(f"Item {item_id} can't be crafted")
+        if amount < 1:
+            raise CraftingError("You have to craft at least one item")
+        deltas, missing = self._resolve(amounts, item_id, amount)
+        if missing:
+            raise MissingIngredientsError(missing)
+        return deltas
+
+    def max_craftable(self, amounts: typing.Mapping[str, int], item_id: str) -> int:
+        """
+        Works out how many of an item an inventory can craft, including crafting any
+        ingredients it doesn't have enough of.
+
+        Args:
+            amounts (`dict` of `str`: `int`): How many of each item the inventory has.
+            item_id (`str`): The ID of the item to craft.
+
+        Returns:
+            `int`: How many of the item can be crafted.
+        """
+
+        if item_id not in self.recipes:
+            return 0
+
+        # An upper bound, treating every ingredient as if nothing else needs it. When no
+        # ingredient is shared between two branches of the recipe, that's the answer.
+        bound: typing.Dict[str, int] = {}
+        for current in reversed(self._plans[item_id]):
+            craftable = min(
+                (bound[i] // per_craft for i, per_craft in self.recipes.get(current, ())),
+                default=0,
+            )
+            bound[current] = craftable + (
+                max(amounts.get(current, 0), 0) if current != item_id else 0
+            )
+        high = bound[item_id]
+        if not high or not self._resolve(amounts, item_id, high)[1]:
+            return high
+
+        # Shared ingredients - search for the most that actually fits under the bound
+        low = 0
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._resolve(amounts, item_id, middle)[1]:
+                high = middle - 1
+            else:
+                low = middle
+        return low
+
+    def craft(
+        self, inventory: Inventory, item_id: str, amount: int = 1
+    ) -> typing.Dict[str, int]:
+        """
+        Crafts an item into an inventory. Every change is made to the inventory at once, so
+        it's journaled and written to the database as one change.
+
+        Args:
+            inventory (:class:`Inventory`): The inventory to craft into.
+            item_id (`str`): The ID of the item to craft.
+            amount (`int`): How many of the item to craft.
+
+        Returns:
+            `dict` of `str`: `int`: How much each item's amount changed, keyed by item ID.
+
+        Raises:
+            :class:`CraftingError`: If the item can't be crafted.
+            :class:`MissingIngredientsError`: If there aren't enough ingredients.
+        """
+
+        deltas = self.plan(inventory.amounts(), item_id, amount)
+        inventory.add_items(
+            *(LootableItem(self.items[i], delta) for i, delta in deltas.items())
+        )
+        return deltas
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 
 from discord.ext import vbu
 
-from . import LootableItem
+from . import Item, LootableItem
 
 
 __all__ = ("Inventory",)
@@ -24,17 +24,7 @@ class InventoryWrapper:
 
     async def __aenter__(self):
         v = await self.db("SELECT * FROM user_inv WHERE user_id=$1", self.user_id)
-        items = []
-        for i in v:
-            try:
-                items.append(
-                    LootableItem.from_item(
-                        self.bot, self.bot.items["all"][i["item_id"]], i["amount"]
-                    )
-                )
-            except KeyError:
-                pass
-        self.inventory = Inventory(self.user_id, *items)
+        self.inventory = Inventory.from_rows(self.bot, self.user_id, v)
         return self.inventory
 
     async def __aexit__(self, *args):
@@ -47,13 +37,18 @@ class Inventory:
     """
     A user's inventory.
 
+    Changes are kept as per-item deltas until they're written to the database, so a write
+    only touches the items that changed.
+
     Attributes:
         user_id (`int`): The user's ID (discord ID)
-        items (`list` of `LootableItem`): The user's inventory items.
+        items (`dict` of `str`: `LootableItem`): The user's inventory items, keyed by item ID.
+        deltas (`dict` of `str`: `int`): How much each changed item's amount has gone up (or
+            down) since the inventory was last written to the database, keyed by item ID.
     """
 
     user_id: int
-    items: typing.List[LootableItem]
+    items: typing.Dict[str, LootableItem]
 
     def __init__(self, user_id: int, *items: typing.Iterable[LootableItem]):
         """
@@ -61,11 +56,113 @@ class Inventory:
 
         Args:
             user_id (`int`): The user's ID (discord ID)
-            items (`iterable` of `LootableItem`): The user's inventory items.
+            items (`iterable` of `LootableItem`): The user's inventory items. Items with the
+                same ID are stacked together.
         """
 
         self.user_id = user_id
-        self.items = list(items)
+        self.items = {}
+        for item in items:
+            try:
+                self.items[item.id].amount += item.amount
+            except KeyError:
+                self.items[item.id] = LootableItem(item.item, item.amount)
+        self.deltas: typing.Dict[str, int] = {}
+        self.version = 0
+        self.flushed_version = 0
+
+        # A function that gets called with the inventory whenever it changes
+        self.observer: typing.Optional[typing.Callable[["Inventory"], None]] = None
+
+    @classmethod
+    def from_rows(
+        cls, bot: vbu.Bot, user_id: int, rows: typing.Iterable[typing.Mapping]
+    ) -> "Inventory":
+        """
+        Builds an inventory from `user_inv` rows. Rows for items that no longer exist, or that
+        the user has none of, are skipped.
+
+        Args:
+            bot (:class:`vbu.Bot`): The bot which has the items cached.
+            user_id (`int`): The user's ID (discord ID)
+            rows (`iterable` of `dict`): The rows, each with an `item_id` and an `amount`.
+        """
+
+        items = []
+        for i in rows:
+            if i["amount"] <= 0:
+                continue
+            try:
+                items.append(
+                    LootableItem.from_item(
+                        bot, bot.items["all"][i["item_id"]], i["amount"]
+                    )
+                )
+            except KeyError:
+                pass
+        return cls(user_id, *items)
+
+    @property
+    def dirty(self) -> bool:
+        """
+        (`bool`) Whether or not the inventory has changed since it was last written to the database.
+        """
+
+        return self.version != self.flushed_version
+
+    def mark_flushed(
+        self, version: int, deltas: typing.Optional[typing.Mapping[str, int]] = None
+    ):
+        """
+        Marks the inventory as written to the database, as of `version`.
+
+        Args:
+            version (`int`): The version of the inventory that was written.
+            deltas (`dict` of `str`: `int`): The deltas that were written. Anything that's
+                changed since they were taken is kept for the next write.
+        """
+
+        for item_id, delta in (deltas or {}).items():
+            remaining = self.deltas.get(item_id, 0) - delta
+            if remaining:
+                self.deltas[item_id] = remaining
+            else:
+                self.deltas.pop(item_id, None)
+        self.flushed_version = max(self.flushed_version, version)
+
+    def changed_amounts(self) -> typing.Dict[str, int]:
+        """
+        Returns how many of each changed item are in the inventory, keyed by item ID. These
+        are the items with an entry in :attr:`deltas`.
+        """
+
+        return {
+            item_id: self.items[item_id].amount if item_id in self.items else 0
+            for item_id in self.deltas
+        }
+
+    def amounts(self) -> typing.Dict[str, int]:
+        """
+        Returns how many of each item are in the inventory, keyed by item ID.
+        """
+
+        return {item_id: item.amount for item_id, item in self.items.items()}
+
+    def rebind(self, items: typing.Mapping[str, Item]):
+        """
+        Points the inventory's stacks at new item definitions, such as the items of a registry
+        that's just been swapped in. Items that aren't in `items` keep their old definition,
+        so the user doesn't lose them until they're next loaded from the database.
+
+        Args:
+            items (`dict` of `str`: :class:`Item`): The new items, keyed by item ID.
+        """
+
+        for item_id, stack in self.items.items():
+            try:
+                stack.item = items[item_id]
+            except KeyError:
+                pass
 
     @classmethod
     def fetch(
@@ -79,23 +176,63 @@ class Inventory:
 
     def add_items(self, *items: LootableItem):
         """
-        Add items to the inventory.
+        Add items to the inventory. Items the inventory already has are added to the
+        existing stack. Items with a negative amount are taken away, but never more than the
+        inventory has, and stacks that run out are removed. The given items are copied, so
+        they can still be used afterwards.
 
         Args:
             items (`iterable` of `LootableItem`): The items to add.
         """
 
-        self.items.extend(items)
+        if not items:
+            return
+        for item in items:
+            stack = self.items.get(item.id)
+            amount = item.amount
+            if amount < 0:
+                amount = -min(-amount, stack.amount if stack is not None else 0)
+                if not amount:
+                    continue
+            if stack is None:
+                stack = self.items[item.id] = LootableItem(item.item, 0)
+            stack.amount += amount
+            if stack.amount <= 0:
+                del self.items[item.id]
+
+            # Items that come back to a delta of 0 are kept, so the journal still sees them
+            self.deltas[item.id] = self.deltas.get(item.id, 0) + amount
+
+        self.version += 1
+        if self.observer is not None:
+            self.observer(self)
 
     async def update_values(self, db: vbu.DatabaseConnection):
         """
-        Update the database with the inventory's values
+        Update the database with the inventory's changes, adding each item's delta to the
+        amount that's stored. Items that run out are deleted.
         """
 
-        await db.conn.executemany(
-            """
-            INSERT into user_inv VALUES ($1, $2, $3) ON CONFLICT (user_id, item_id) DO UPDATE
-            SET amount = $3;
-            """,
-            tuple((self.user_id, x.id, x.amount) for x in self.items),
-        )
+        deltas = dict(self.deltas)
+        changed = {item_id: delta for item_id, delta in deltas.items() if delta}
+        if changed:
+            await db(
+                """
+                INSERT INTO user_inv (user_id, item_id, amount)
+                SELECT $1::BIGINT, * FROM unnest($2::TEXT[], $3::INT[])
+                ON CONFLICT (user_id, item_id) DO UPDATE
+                SET amount = user_inv.amount + excluded.amount
+                """,
+                self.user_id,
+                list(changed),
+                list(changed.values()),
+            )
+            await db(
+                """
+                DELETE FROM user_inv
+                WHERE user_id = $1 AND item_id = ANY($2::TEXT[]) AND amount <= 0
+                """,
+                self.user_id,
+                list(changed),
+            )
+        self.mark_flushed(self.version, deltas)
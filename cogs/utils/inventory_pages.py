@@ -0,0 +1,302 @@
+import typing
+
+from discord.ext import vbu
+
+from . import LootableItem
+from .paginator import Filter, PageSource, Sorter
+from .registry import Registry
+
+
+__all__ = (
+    "sync_item_info",
+    "InventoryPageSource",
+)
+
+
+async def sync_item_info(db: vbu.DatabaseConnection, registry: Registry) -> None:
+    """
+    :coro: Copies what the database needs to know about each item in a registry - its name,
+    type and rarity rank - into the `item_info` table, so inventories can be sorted and
+    filtered by the database. Items that aren't in the registry any more are removed.
+
+    Args:
+        db (:class:`vbu.DatabaseConnection`): The database connection.
+        registry (:class:`Registry`): The registry to copy the items of.
+    """
+
+    items = list(registry.items["all"].values())
+    async with db.conn.transaction():
+        await db(
+            """
+            INSERT INTO item_info (item_id, name, type, rarity_rank)
+            SELECT * FROM unnest($1::TEXT[], $2::TEXT[], $3::TEXT[], $4::SMALLINT[])
+            ON CONFLICT (item_id) DO UPDATE
+            SET name = excluded.name,
+                type = excluded.type,
+                rarity_rank = excluded.rarity_rank
+            """,
+            [i.id for i in items],
+            [i.name for i in items],
+            [i.type for i in items],
+            [registry.index.rarity_ranks[i.id] for i in items],
+        )
+        await db(
+            "DELETE FROM item_info WHERE item_id <> ALL($1::TEXT[])",
+            [i.id for i in items],
+        )
+
+
+class InventoryPageSource(PageSource):
+    """
+    A user's inventory for the :class:`Paginator`, fetched from the database one page at a
+    time, so opening a huge inventory doesn't mean loading all of it.
+
+    The database does the sorting and filtering. Pages are fetched with keyset pagination -
+    each page carries on from where the page next to it ended, instead of counting its way
+    through every row before it - so every page costs about the same to fetch. Each ordering
+    has an index on `item_info` with the same keys, which the query walks from that point,
+    looking up the user's stacks as it goes.
+
+    Anything that hasn't been written to the database yet won't be shown, so write the user
+    first.
+
+    Attributes:
+        bot (:class:`vbu.Bot`): The bot which has the items cached.
+        user_id (`int`): The user's ID (discord ID)
+        types (`dict` of `str`: `str`): The item type each :class:`Filter` shows, keyed by
+            filter ID.
+    """
+
+    # Sorter ID -> the columns to sort by (as SQL and the type of their values), and whether
+    # they're sorted descending. Item IDs come last, so no two rows sort the same. Each of
+    # these matches an index on item_info in config/database.pgsql, so keep them in step.
+    ORDERINGS: typing.Dict[
+        str, typing.Tuple[typing.Tuple[typing.Tuple[str, str], ...], bool]
+    ] = {
+        "ALPHABETICAL": (
+            (('i.name COLLATE "C"', "TEXT"), ("i.item_id", "TEXT")),
+            False,
+        ),
+        "REVERSE_ALPHABETICAL": (
+            (('i.name COLLATE "C"', "TEXT"), ("i.item_id", "TEXT")),
+            True,
+        ),
+        "RARITY": (
+            (
+                ("-i.rarity_rank", "INT"),
+                ('i.name COLLATE "C"', "TEXT"),
+                ("i.item_id", "TEXT"),
+            ),
+            False,
+        ),
+        "REVERSE_RARITY": (
+            (
+                ("i.rarity_rank", "INT"),
+                ('i.name COLLATE "C"', "TEXT"),
+                ("i.item_id", "TEXT"),
+            ),
+            False,
+        ),
+    }
+    DEFAULT_ORDERING = "ALPHABETICAL"
+
+    def __init__(
+        self,
+        bot: vbu.Bot,
+        user_id: int,
+        *,
+        types: typing.Optional[typing.Mapping[str, str]] = None,
+    ):
+        """
+        Args:
+            bot (:class:`vbu.Bot`): The bot which has the items cached.
+            user_id (`int`): The user's ID (discord ID)
+            types (`dict` of `str`: `str`): The item type each :class:`Filter` shows, keyed
+                by filter ID.
+        """
+
+        self.bot = bot
+        self.user_id = user_id
+        self.types = dict(types or {})
+
+        # The sort keys of the first and last row of each page fetched so far, keyed by page
+        # number, and the number of rows there are - for the current sorter and filters only
+        self._state = None
+        self._bounds: typing.Dict[int, typing.Tuple[tuple, tuple]] = {}
+        self._total: typing.Optional[int] = None
+
+    def _filter_types(self, filters: typing.List[Filter]) -> typing.Optional[list]:
+        """
+        Gets the item types the filters show, or `None` if everything's shown.
+        """
+
+        if not filters:
+            return None
+        return [self.types[f.id] for f in filters if f.id in self.types]
+
+    def _where(self, filters: typing.List[Filter], args: list) -> str:
+        """
+        Builds the conditions every query shares, adding their arguments to `args`.
+        """
+
+        args.append(self.user_id)
+        where = "u.user_id = $1 AND u.amount > 0"
+        types = self._filter_types(filters)
+        if types is not None:
+            args.append(types)
+            where += f" AND i.type = ANY(${len(args)}::TEXT[])"
+        return where
+
+    async def count(self, filters: typing.List[Filter]) -> int:
+        """
+        :coro: Counts the stacks in the inventory that pass the filters.
+
+        Args:
+            filters (`list` of :class:`Filter`): The current filters. Empty if there are none.
+        """
+
+        args = []
+        where = self._where(filters, args)
+        async with vbu.DatabaseConnection() as db:
+            rows = await db(
+                f"""
+                SELECT COUNT(*) AS count FROM item_info i
+                JOIN user_inv u ON u.user_id = $1 AND u.item_id = i.item_id
+                WHERE {where}
+                """,
+                *args,
+            )
+        self._total = rows[0]["count"]
+        return self._total
+
+    async def _fetch(
+        self,
+        ordering: str,
+        filters: typing.List[Filter],
+        limit: int,
+        *,
+        after: typing.Optional[tuple] = None,
+        before: typing.Optional[tuple] = None,
+        from_end: bool = False,
+        offset: int = 0,
+    ) -> list:
+        """
+        Fetches rows from the inventory, in order.
+
+        Args:
+            ordering (`str`): The ID of the ordering to use.
+            filters (`list` of :class:`Filter`): The current filters.
+            limit (`int`): The most rows to fetch.
+            after (`tuple`): Only fetch rows after the row with these sort keys.
+            before (`tuple`): Only fetch rows before the row with these sort keys.
+            from_end (`bool`): Fetch the last rows, instead of the first.
+            offset (`int`): How many rows to skip. Only used when there's no row to carry on
+                from.
+        """
+
+        keys, descending = self.ORDERINGS[ordering]
+
+        # Rows before something, or at the end, are fetched backwards and flipped around
+        backwards = before is not None or from_end
+        descending = descending != backwards
+
+        args = []
+        where = self._where(filters, args)
+        bound = after if after is not None else before
+        if bound is not None:
+            placeholders = []
+            for (_, cast), value in zip(keys, bound):
+                args.append(value)
+                placeholders.append(f"${len(args)}::{cast}")
+            where += " AND ({}) {} ({})".format(
+                ", ".join(sql for sql, _ in keys),
+                "<" if descending else ">",
+                ", ".join(placeholders),
+            )
+        args.append(limit)
+        # Walk item_info's index for the ordering from the bound, looking each item up in
+        # user_inv's primary key, so only about a page of rows is read
+        query = """
+            SELECT u.item_id, u.amount, {} FROM item_info i
+            JOIN user_inv u ON u.user_id = $1 AND u.item_id = i.item_id
+            WHERE {}
+            ORDER BY {}
+            LIMIT ${}
+        """.format(
+            ", ".join(f"{sql} AS key_{n}" for n, (sql, _) in enumerate(keys)),
+            where,
+            ", ".join(f"{sql} {'DESC' if descending else 'ASC'}" for sql, _ in keys),
+            len(args),
+        )
+        if offset and bound is None:
+            args.append(offset)
+            query += f" OFFSET ${len(args)}"
+
+        async with vbu.DatabaseConnection() as db:
+            rows = await db(query, *args)
+        return list(reversed(rows)) if backwards else list(rows)
+
+    async def get_page(
+        self,
+        page_number: int,
+        per_page: int,
+        sorter: typing.Optional[Sorter],
+        filters: typing.List[Filter],
+    ) -> typing.List[LootableItem]:
+        """
+        :coro: Gets the stacks on a page of the inventory.
+
+        Args:
+            page_number (`int`): The page number, starting at 0.
+            per_page (`int`): How many stacks are on each page.
+            sorter (:class:`Sorter`): The current sorter, if there is one.
+            filters (`list` of :class:`Filter`): The current filters. Empty if there are none.
+        """
+
+        ordering = sorter.id if sorter is not None else self.DEFAULT_ORDERING
+        if ordering not in self.ORDERINGS:
+            ordering = self.DEFAULT_ORDERING
+
+        # Pages fetched with another sorter or other filters don't tell us anything
+        state = (ordering, tuple(sorted(f.id for f in filters)), per_page)
+        if state != self._state:
+            self._state = state
+            self._bounds.clear()
+
+        # Carry on from whichever page next to this one we've already got
+        if page_number == 0:
+            rows = await self._fetch(ordering, filters, per_page)
+        elif page_number - 1 in self._bounds:
+            rows = await self._fetch(
+                ordering, filters, per_page, after=self._bounds[page_number - 1][1]
+            )
+        elif page_number + 1 in self._bounds:
+            rows = await self._fetch(
+                ordering, filters, per_page, before=self._bounds[page_number + 1][0]
+            )
+        elif self._total is not None and page_number == (self._total - 1) // per_page:
+            rows = await self._fetch(
+                ordering,
+                filters,
+                self._total - page_number * per_page,
+                from_end=True,
+            )
+        else:
+            rows = await self._fetch(
+                ordering, filters, per_page, offset=page_number * per_page
+            )
+
+        keys = len(self.ORDERINGS[ordering][0])
+        if rows:
+            self._bounds[page_number] = (
+                tuple(rows[0][f"key_{n}"] for n in range(keys)),
+                tuple(rows[-1][f"key_{n}"] for n in range(keys)),
+            )
+
+        # Items that were removed from the config since the registry was synced are skipped
+        items = self.bot.items["all"]
+        return [
+            LootableItem(items[row["item_id"]], row["amount"])
+            for row in rows
+            if row["item_id"] in items
+        ]
@@ -1,7 +1,6 @@
 import typing
 from dataclasses import dataclass
 
-import discord
 from discord.ext import vbu
 
 
@@ -144,19 +143,27 @@ class Item:
         id (`str` UPPER_SNAKE_CASE): The ID of the item.
         type (`str` UPPER_SNAKE_CASE): The type of the item.
         rarity (`str` UPPER_SNAKE_CASE): The rarity of the item.
-        emoji (`int` or `str`): The custom ID of the emoji associated with the item.
+        emoji_id (`int` or `str`): The custom ID of the emoji associated with the item, or the
+            emoji itself.
+        emoji (`str`): The emoji, ready to put in a message. Custom emojis are empty until
+            :meth:`resolve_emoji` finds them.
         name (`str`): The name of the item.
         description (`str`): The description of the item.
         skill_requirements (`list` of :class:`SkillRequirements`): The skill requirements of the item.
         shop_settings (`list` of :class:`ShopSettings`): The shop settings of the item.
         recipe (`list` of :class:`Recipe`): The recipe of the item.
         usage (:class:`Usage`): The usage of the item.
+        article (`str`): "a" or "an", whichever goes before the item's name.
+        plural (`str`): What goes after the item's name when there's more than one of it.
+        display (`str`): The item's emoji and name in bold, e.g. "**🎸 guitar**".
+        display_one (`str`): One of the item, e.g. "a **🎸 guitar**".
     """
 
     id: str
     type: str
     rarity: str
-    emoji: int
+    emoji_id: typing.Union[int, str]
+    emoji: str
     name: str
     description: str
     skill_requirements: typing.List[SkillRequirements]
@@ -180,22 +187,25 @@ class Item:
     ):
         """
         Args:
+            bot (:class:`vbu.Bot`): The bot. Unused, but kept for compatibility - emojis are
+                found by :meth:`resolve_emoji`.
             id (`str` UPPER_SNAKE_CASE): The ID of the item.
             type (`str` UPPER_SNAKE_CASE): The type of the item..
             rarity (`str` UPPER_SNAKE_CASE): The rarity of the item.
-            emoji (`int` or `str`): The custom ID of the emoji associated with the item.
+            emoji (`int` or `str`): The custom ID of the emoji associated with the item, or
+                the emoji itself.
             name (`str`): The name of the item.
             description (`str`): The description of the item.
             skill_requirements (`list` of :class:`SkillRequirements`): The skill requirements of the item.
             shop_settings (`list` of :class:`ShopSettings`): The shop settings of the item.
             recipe (`list` of :class:`Recipe`): The recipe of the item.
             usage (:class:`Usage`): The usage of the item.
-            amount (`int`): The amount of the item.
         """
         self.id = id
         self.type = type
         self.rarity = rarity
-        self.emoji = bot.get_emoji(emoji) if isinstance(emoji, int) else emoji
+        self.emoji_id = emoji
+        self.emoji = "" if isinstance(emoji, int) else str(emoji)
         self.name = name
         self.description = description
         self.skill_requirements = skill_requirements
@@ -203,6 +213,20 @@ class Item:
         self.recipe = recipe
         self.usage = usage
 
+        # Some grammar stuff to make this flow better
+        self.article = "an" if name[:1].lower() in ("a", "e", "i", "o", "u") else "a"
+        self.plural = "" if name.lower().endswith("s") else "s"
+        self._render()
+
+    def _render(self) -> None:
+        """
+        Builds the bits of text that show the item, so they aren't built again every time
+        it's shown. Needs running again whenever the emoji or name changes.
+        """
+
+        self.display = f"**{self.emoji} {self.name}**"
+        self.display_one = f"{self.article} {self.display}"
+
     @classmethod
     def from_dict(cls, bot: vbu.Bot, data: dict):
         """
@@ -217,9 +241,7 @@ class Item:
             data["id"],
             data["type"],
             data["rarity"],
-            bot.get_emoji(data["emoji"])
-            if isinstance(data["emoji"], int)
-            else data["emoji"],
+            data["emoji"],
             data["name"],
             data["description"],
             [SkillRequirements(**req) for req in data["skill_requirements"] if req],
@@ -228,92 +250,74 @@ class Item:
             Usage.from_dict(data["usage"]),
         )
 
+    def resolve_emoji(self, bot: vbu.Bot) -> bool:
+        """
+        Looks up the item's custom emoji, so :attr:`emoji` is ready to put in a message.
+        Emojis that aren't custom don't need looking up.
 
-@dataclass
-class LootableItem(Item):
+        Args:
+            bot (:class:`vbu.Bot`): The bot, with its emoji cache loaded.
+
+        Returns:
+            `bool`: Whether or not the emoji was found.
+        """
+
+        if not isinstance(self.emoji_id, int):
+            return True
+        emoji = bot.get_emoji(self.emoji_id)
+        self.emoji = str(emoji) if emoji is not None else ""
+        self._render()
+        return emoji is not None
+
+
+class LootableItem:
     """
-    An item that can be looted, given, received, etc.
+    A stack of an item that can be looted, given, received, etc. Only the amount is stored -
+    everything else (:attr:`Item.name`, :attr:`Item.emoji`, :attr:`Item.rarity` and so on) is
+    read from the shared :class:`Item` in `bot.items["all"]`, so a stack costs the same no
+    matter how big the item definition is.
 
     Attributes:
-        id (`str` UPPER_SNAKE_CASE): The ID of the item.
-        type (`str` UPPER_SNAKE_CASE): The type of the item..
-        rarity (`str` UPPER_SNAKE_CASE): The rarity of the item.
-        emoji (`int` or `str`): The custom ID of the emoji associated with the item.
-        name (`str`): The name of the item.
-        description (`str`): The description of the item.
-        skill_requirements (`list` of :class:`SkillRequirements`): The skill requirements of the item.
-        shop_settings (`list` of :class:`ShopSettings`): The shop settings of the item.
-        recipe (`list` of :class:`Recipe`): The recipe of the item.
-        usage (:class:`Usage`): The usage of the item.
+        item (:class:`Item`): The item this is a stack of.
         amount (`int`): The amount of the item.
     """
 
-    amount: int = 1
+    __slots__ = ("item", "amount")
 
-    def __init__(
-        self,
-        bot: vbu.Bot,
-        id: str,
-        type: str,
-        rarity: str,
-        emoji: typing.Union[int, discord.Emoji],
-        name: str,
-        description: str,
-        skill_requirements: typing.List[SkillRequirements],
-        shop_settings: ShopSettings,
-        recipe: typing.List[Recipe],
-        usage: Usage,
-        amount: int = 1,
-    ):
+    def __init__(self, item: Item, amount: int = 1):
         """
         Args:
-            bot (:class:`vbu.Bot`): The bot.
-            id (`str` UPPER_SNAKE_CASE): The ID of the item.
-            type (`str` UPPER_SNAKE_CASE): The type of the item..
-            rarity (`str` UPPER_SNAKE_CASE): The rarity of the item.
-            emoji (`int` or `str`): The custom ID of the emoji associated with the item.
-            name (`str`): The name of the item.
-            description (`str`): The description of the item.
-            skill_requirements (`list` of :class:`SkillRequirements`): The skill requirements of the item.
-            shop_settings (`list` of :class:`ShopSettings`): The shop settings of the item.
-            recipe (`list` of :class:`Recipe`): The recipe of the item.
-            usage (:class:`Usage`): The usage of the item.
+            item (:class:`Item`): The item this is a stack of.
             amount (`int`): The amount of the item.
         """
 
-        self.id = id
-        self.type = type
-        self.rarity = rarity
-        self.emoji = bot.get_emoji(emoji) if isinstance(emoji, int) else emoji
-        self.name = name
-        self.description = description
-        self.skill_requirements = skill_requirements
-        self.shop_settings = shop_settings
-        self.recipe = recipe
-        self.usage = usage
+        self.item = item
         self.amount = amount
 
+    def __getattr__(self, name: str):
+        # Only called for attributes that aren't slots - everything else comes from the item.
+        # `item` itself can be missing while unpickling, so don't recurse looking for it.
+        if name == "item":
+            raise AttributeError(name)
+        return getattr(self.item, name)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(id={self.item.id!r}, amount={self.amount!r})"
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, LootableItem):
+            return NotImplemented
+        return self.item.id == other.item.id and self.amount == other.amount
+
     @classmethod
     def from_item(cls, bot: vbu.Bot, item: Item, amount: int):
         """
         Loads a :class:`LootableItem` from an :class:`Item`.
 
         Args:
+            bot (:class:`vbu.Bot`): The bot. Unused, but kept for compatibility.
             item (:class:`Item`): The item to load from.
             amount (`int`): The amount of the item.
         """
 
-        return cls(
-            bot,
-            item.id,
-            item.type,
-            item.rarity,
-            item.emoji,
-            item.name,
-            item.description,
-            item.skill_requirements,
-            item.shop_settings,
-            item.recipe,
-            item.usage,
-            amount,
-        )
+        return cls(item, amount)
@@ -0,0 +1,244 @@
+import os
+import json
+import typing
+import asyncio
+import logging
+
+
+__all__ = ("Journal",)
+
+
+class Journal:
+    """
+    An append-only, segmented journal on the local disk.
+
+    Records are buffered in memory and written in groups - every `commit_interval` seconds,
+    whatever has been appended is written to the current segment and fsynced in one go, so
+    a burst of appends costs one fsync. If a write fails, its records are kept and written
+    again later, and :attr:`error_listener` is told so the records can be saved some other way
+    in the meantime.
+
+    Segments are numbered files (`000000000001.journal`) that are rotated once they get bigger
+    than `segment_size` bytes, or when :meth:`seal` is called.
+
+    ::
+        journal = utils.Journal("journal")
+        journal.open()
+        journal.append(["pp", 1234, "Unnamed Pp", 50, 1.0])
+
+        # Later, before saving everything somewhere else
+        sealed = journal.seal()
+        ...
+        await journal.truncate(sealed)
+
+    Attributes:
+        directory (`str`): The directory the segments are stored in.
+        commit_interval (`float`): How long (in seconds) to gather appends before writing them.
+        segment_size (`int`): The size (in bytes) after which a new segment is started.
+        error_listener (`callable`): A function that gets called whenever writing to the
+            journal fails.
+    """
+
+    SUFFIX = ".journal"
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        commit_interval: typing.Optional[float] = 0.005,
+        segment_size: typing.Optional[int] = 4 * 1024 * 1024,
+        logger: typing.Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            directory (`str`): The directory the segments are stored in.
+            commit_interval (`float`): How long (in seconds) to gather appends before writing them.
+            segment_size (`int`): The size (in bytes) after which a new segment is started.
+            logger (:class:`logging.Logger`): Where to log failed writes.
+        """
+
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.segment_size = segment_size
+        self.logger = logger or logging.getLogger(__name__)
+        self.error_listener: typing.Optional[typing.Callable[[], None]] = None
+
+        self._segment_id = 0
+        self._segment_bytes = 0
+
+        # (segment ID, line) pairs that haven't been written yet
+        self._pending: typing.List[typing.Tuple[int, str]] = []
+
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._committer: typing.Optional[asyncio.Task] = None
+
+    def _path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"{segment_id:012d}{self.SUFFIX}")
+
+    def segment_ids(self) -> typing.List[int]:
+        """
+        Returns the IDs of the segments on disk, oldest first.
+        """
+
+        try:
+            filenames = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(
+            int(filename[: -len(self.SUFFIX)])
+            for filename in filenames
+            if filename.endswith(self.SUFFIX) and filename[: -len(self.SUFFIX)].isdigit()
+        )
+
+    def read(self) -> typing.Tuple[int, typing.List[typing.Any]]:
+        """
+        Reads every record from the segments on disk, in the order they were appended. This
+        blocks, so it should be run in an executor if the event loop is running.
+
+        Returns:
+            `tuple` of `int` and `list`: The ID of the newest segment read (or 0 if there are
+                none) and the records.
+        """
+
+        records = []
+        segment_ids = self.segment_ids()
+        for segment_id in segment_ids:
+            with open(self._path(segment_id), encoding="utf-8") as f:
+                for line in f:
+
+                    # A torn write from a crash can only ever be the last line of a segment
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+        return (segment_ids[-1] if segment_ids else 0), records
+
+    def open(self) -> None:
+        """
+        Starts writing to a new segment after any that are already on disk, and starts the
+        background task that writes appended records.
+        """
+
+        os.makedirs(self.directory, exist_ok=True)
+        segment_ids = self.segment_ids()
+        self._segment_id = (segment_ids[-1] if segment_ids else 0) + 1
+        self._segment_bytes = 0
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.get_event_loop().create_task(self._commit_loop())
+
+    def append(self, record: typing.Any) -> None:
+        """
+        Appends a record to the journal. The record will be written to disk within
+        `commit_interval` seconds.
+
+        Args:
+            record (`any`): A JSON serializable record.
+        """
+
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._pending.append((self._segment_id, line))
+        self._segment_bytes += len(line.encode("utf-8"))
+        if self._segment_bytes >= self.segment_size:
+            self.seal()
+        self._wakeup.set()
+
+    def seal(self) -> int:
+        """
+        Closes the current segment - everything appended from now on goes into a new one.
+
+        Returns:
+            `int`: The ID of the sealed segment. Every record appended before this call is in
+                this segment or an older one.
+        """
+
+        sealed = self._segment_id
+        self._segment_id += 1
+        self._segment_bytes = 0
+        return sealed
+
+    async def commit(self) -> None:
+        """
+        :coro: Writes and fsyncs everything that has been appended so far. If that fails,
+        nothing is lost - the records are kept to be written next time.
+        """
+
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                await asyncio.get_event_loop().run_in_executor(None, self._write, batch)
+            except BaseException:
+                # Keep the records, ahead of anything appended since, to write next time.
+                # Lines that did make it are written again, which replaying doesn't mind.
+                self._pending[:0] = batch
+                raise
+
+    def _write(self, batch: typing.List[typing.Tuple[int, str]]) -> None:
+        segments: typing.Dict[int, typing.List[str]] = {}
+        for segment_id, line in batch:
+            segments.setdefault(segment_id, []).append(line)
+        for segment_id, lines in segments.items():
+            with open(self._path(segment_id), "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def _commit_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+
+            # Give any other appends a chance to join this group
+            await asyncio.sleep(self.commit_interval)
+            self._wakeup.clear()
+            try:
+                await self.commit()
+            except Exception as e:
+                self.logger.error(f"Writing user cache journal... failed - {e}")
+                if self.error_listener is not None:
+                    self.error_listener()
+
+                # Try again in a bit, whether or not anything else gets appended
+                await asyncio.sleep(1.0)
+                self._wakeup.set()
+
+    async def truncate(self, segment_id: int) -> int:
+        """
+        :coro: Deletes a segment and every segment older than it, along with any of their
+        records that haven't been written yet. Call this once everything in them is saved
+        elsewhere.
+
+        Args:
+            segment_id (`int`): The ID of the newest segment to delete, from :meth:`seal`.
+
+        Returns:
+            `int`: The number of segments deleted.
+        """
+
+        async with self._lock:
+            self._pending = [i for i in self._pending if i[0] > segment_id]
+            return await asyncio.get_event_loop().run_in_executor(
+                None, self._delete, segment_id
+            )
+
+    def _delete(self, segment_id: int) -> int:
+        deleted = 0
+        for i in self.segment_ids():
+            if i > segment_id:
+                break
+            os.remove(self._path(i))
+            deleted += 1
+        return deleted
+
+    async def close(self) -> None:
+        """
+        :coro: Stops the background task and writes anything that's still pending.
+        """
+
+        # Hold the lock so we never cancel the background task halfway through a write
+        async with self._lock:
+            if self._committer is not None:
+                self._committer.cancel()
+                self._committer = None
+        await self.commit()
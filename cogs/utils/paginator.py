@@ -1,7 +1,9 @@
+import abc
+import copy
 import typing
 import asyncio
 import inspect
-import itertools
+import collections
 
 import discord
 from discord.ext import commands, vbu
@@ -12,13 +14,16 @@ __all__ = (
     "Filters",
     "Sorter",
     "Sorters",
+    "PageSource",
     "Paginator",
+    "PersistentPaginator",
 )
 
 
 class Filter:
     """
-    A filter method to use within the class :class:`Sorters`.
+    A filter method to use within the class :class:`Sorters`. The `filterer` can be left out
+    when paginating a :class:`PageSource`, which does its own filtering.
     """
 
     def __init__(
@@ -27,7 +32,7 @@ class Filter:
         id: str,
         *,
         description: typing.Optional[str] = None,
-        filterer: typing.Callable[[list], list],
+        filterer: typing.Optional[typing.Callable[[list], list]] = None,
     ):
         self.label = label
         self.id = id
@@ -77,21 +82,20 @@ class Filters:
 
         if not self.current_filters:
             return data
-        filtered = []
+
+        # Anything that passes any of the filters is kept, in its original order
+        if len(self.current_filters) == 1:
+            return list(self.current_filters[0].filterer(data))
+        kept = set()
         for i in self.current_filters:
-            filtered.append(i.filterer(data))
-        x = list(
-            filtered
-            for filtered, _ in itertools.groupby(
-                sorted([j for i in filtered for j in i], key=lambda x: x.id)
-            )
-        )
-        return x
+            kept.update(map(id, i.filterer(data)))
+        return [i for i in data if id(i) in kept]
 
 
 class Sorter:
     """
-    A container of sorting methods to use with in the :class:`Paginator`
+    A container of sorting methods to use with in the :class:`Paginator`. The `sorter` can be
+    left out when paginating a :class:`PageSource`, which does its own sorting.
 
     Args:
         options (`dict`): A dictionary of `Sorter`s to use.
@@ -103,7 +107,7 @@ class Sorter:
         label: str,
         description: str,
         id: str,
-        sorter: typing.Callable[[list], list],
+        sorter: typing.Optional[typing.Callable[[list], list]] = None,
     ):
         self.label = label
         self.description = description
@@ -177,6 +181,41 @@ class Sorters:
         )
 
 
+class PageSource(abc.ABC):
+    """
+    Data for the :class:`Paginator` that's fetched one page at a time, such as from the
+    database, instead of being held in a list. The source does its own sorting and filtering,
+    based on the IDs of the paginator's current :class:`Sorter` and :class:`Filter`s.
+    """
+
+    @abc.abstractmethod
+    async def count(self, filters: typing.List[Filter]) -> int:
+        """
+        :coro: Counts the things that pass the filters.
+
+        Args:
+            filters (`list` of :class:`Filter`): The current filters. Empty if there are none.
+        """
+
+    @abc.abstractmethod
+    async def get_page(
+        self,
+        page_number: int,
+        per_page: int,
+        sorter: typing.Optional[Sorter],
+        filters: typing.List[Filter],
+    ) -> typing.List[typing.Any]:
+        """
+        :coro: Gets the things on a page.
+
+        Args:
+            page_number (`int`): The page number, starting at 0.
+            per_page (`int`): How many things are on each page.
+            sorter (:class:`Sorter`): The current sorter, if there is one.
+            filters (`list` of :class:`Filter`): The current filters. Empty if there are none.
+        """
+
+
 class Paginator:
     """
     An automatic paginator util that takes a list and listens for reactions on a message
@@ -202,7 +241,10 @@ class Paginator:
     def __init__(
         self,
         data: typing.Union[
-            typing.Sequence, typing.Generator, typing.Callable[[int], typing.Any]
+            typing.Sequence,
+            typing.Generator,
+            typing.Callable[[int], typing.Any],
+            PageSource,
         ],
         *,
         per_page: typing.Optional[int] = 10,
@@ -224,26 +266,36 @@ class Paginator:
                 If a function is given, then you will be passed the page number as an argument - raising
                 `StopIteration` from this function will cause the `max_pages` attribute to be set,
                 and the page will go back to what it was previously.
+                If a :class:`PageSource` is given, it's asked for one page at a time, and does the
+                sorting and filtering itself.
             per_page (int, optional): The number of items that appear on each page. This argument only works for sequences
             formatter (typing.Callable[['Paginator', typing.Sequence[typing.Any]], typing.Union[str, discord.Embed, dict]], optional): A
                 function taking the paginator instance and a list of things to display, returning a dictionary of kwargs that get passed
                 directly into a :func:`discord.Message.edit`.
         """
-        if not isinstance(data, typing.Sequence):
+        if isinstance(data, PageSource):
+            self.sorters = sorters
+            self.filters = filters
+            self.data = data
+            self.filtered_data = None
+        elif not isinstance(data, typing.Sequence):
             self.sorters = None
             self.filters = None
             self.data = data
             self.filtered_data = self.data
         else:
-            data = list(data)
+            if sorters is not None and any(
+                s.sorter is None for s in sorters.options.values()
+            ):
+                raise ValueError("Every `Sorter` needs a sorter to sort a sequence")
+            if filters is not None and any(
+                f.filterer is None for f in filters.options.values()
+            ):
+                raise ValueError("Every `Filter` needs a filterer to filter a sequence")
             self.sorters: Sorters = sorters
-            if self.sorters.current_sorter is not None:
-                self.data = data
-                self.filtered_data = self.sorters.current_sorter.sorter(data)
-            else:
-                self.data = data
-                self.filtered_data = self.data
             self.filters: Filters = filters
+            self.data = list(data)
+            self.filtered_data = self.data
         self.per_page: int = per_page
         self.formatter: typing.Callable[
             ["Paginator", typing.Sequence[typing.Any]],
@@ -256,7 +308,20 @@ class Paginator:
         self.current_page: int = None
         self._page_cache = {}
 
+        # The user the paginator's for, and the persistent paginator it belongs to, if any
+        self.author: typing.Optional[discord.abc.User] = None
+        self.persistent: typing.Optional["PersistentPaginator"] = None
+
+        # (sorter ID, filter IDs) -> the data sorted and filtered that way, least recently
+        # used first. Going back to a sorter or filters that were used before is free.
+        self._views: typing.OrderedDict[
+            typing.Tuple[typing.Optional[str], typing.FrozenSet[str]], list
+        ] = collections.OrderedDict()
+        if self.sorters is not None and not isinstance(self.data, PageSource):
+            self.filtered_data = self._get_view()
+
         self.max_pages: int = "?"
+        self._data_is_source = isinstance(self.data, PageSource)
         self._data_is_generator = any(
             (
                 inspect.isasyncgenfunction(self.data),
@@ -271,7 +336,9 @@ class Paginator:
                 inspect.iscoroutine(self.data),
             )
         )
-        self._data_is_iterable = not (self._data_is_generator or self._data_is_function)
+        self._data_is_iterable = not (
+            self._data_is_generator or self._data_is_function or self._data_is_source
+        )
         if self._data_is_iterable:
             pages, left_over = divmod(len(data), self.per_page)
             if left_over:
@@ -300,6 +367,9 @@ class Paginator:
 
         # Set our initial values
         self.current_page = 0
+        self.author = ctx.author
+        if self._data_is_source:
+            await self._count_pages()
         if self.max_pages == 0:
             await ctx.send("There's literally nothing here LMAO")
             return
@@ -321,17 +391,7 @@ class Paginator:
                 break
 
             # Format the page data
-            payload: typing.Dict[str, typing.Any] = self.formatter(self, items)
-            if isinstance(payload, discord.Embed):
-                payload = {"embeds": [payload]}
-            elif isinstance(payload, str):
-                payload = {"content": payload}
-            if embed := payload.pop("embed", None):
-                payload.update({"embeds": [embed]})
-
-            # Set a default for these things
-            payload.setdefault("content", None)
-            payload.setdefault("embeds", None)
+            payload = self.format_page(items)
 
             # Work out what components to show
             components = self.get_pagination_components()
@@ -342,7 +402,9 @@ class Paginator:
 
             # See if we want to bother paginating
             last_payload = payload
-            if self.max_pages == 1 and not self.filters.current_filters:
+            if self.max_pages == 1 and (
+                self.filters is None or not self.filters.current_filters
+            ):
                 break
 
             # Wait for reactions to be added by the user
@@ -379,6 +441,8 @@ class Paginator:
 
                     # Clear the cache
                     self._page_cache.clear()
+                    if self._data_is_source:
+                        await self._count_pages()
 
             else:
                 # Change the page number based on the component interaction
@@ -400,43 +464,113 @@ class Paginator:
             self._edit_message(ctx, components=components.disable_components())
         )
 
+    def format_page(
+        self, items: typing.List[typing.Any]
+    ) -> typing.Dict[str, typing.Any]:
+        """
+        Formats the items on a page into the kwargs for sending or editing a message.
+        """
+
+        payload: typing.Dict[str, typing.Any] = self.formatter(self, items)
+        if isinstance(payload, discord.Embed):
+            payload = {"embeds": [payload]}
+        elif isinstance(payload, str):
+            payload = {"content": payload}
+        if embed := payload.pop("embed", None):
+            payload.update({"embeds": [embed]})
+
+        # Set a default for these things
+        payload.setdefault("content", None)
+        payload.setdefault("embeds", None)
+        return payload
+
+    def _custom_id(self, action: str) -> str:
+        """
+        Gets the custom ID of a component. A persistent paginator's custom IDs hold everything
+        needed to show the next page.
+        """
+
+        if self.persistent is None:
+            return action
+        return self.persistent.encode(self, action)
+
     def get_pagination_components(self):
         components = discord.ui.MessageComponents(
             discord.ui.ActionRow(
                 discord.ui.Button(
                     emoji="<:START:892833211120496721>",
-                    custom_id="START",
+                    custom_id=self._custom_id("START"),
                     disabled=self.current_page == 0,
                 ),
                 discord.ui.Button(
                     emoji="<:PREVIOUS:892833166950273075>",
-                    custom_id="PREVIOUS",
+                    custom_id=self._custom_id("PREVIOUS"),
                     disabled=self.current_page == 0,
                 ),
                 discord.ui.Button(
                     emoji="<:NEXT:892832013491503124>",
-                    custom_id="NEXT",
+                    custom_id=self._custom_id("NEXT"),
                     disabled=self.max_pages != "?"
                     and self.current_page >= self.max_pages - 1,
                 ),
                 discord.ui.Button(
                     emoji="<:END:892833141205647430>",
-                    custom_id="END",
+                    custom_id=self._custom_id("END"),
                     disabled=self.max_pages == "?"
                     or self.current_page >= self.max_pages - 1,
                 ),
             ),
         )
         if self.sorters is not None:
-            components.add_component(
-                discord.ui.ActionRow(self.sorters.to_selectmenu()),
-            )
+            menu = self.sorters.to_selectmenu()
+            menu.custom_id = self._custom_id("SORTER")
+            components.add_component(discord.ui.ActionRow(menu))
         if self.filters is not None:
-            components.add_component(
-                discord.ui.ActionRow(self.filters.to_selectmenu()),
-            )
+            menu = self.filters.to_selectmenu()
+            menu.custom_id = self._custom_id("FILTER")
+            components.add_component(discord.ui.ActionRow(menu))
         return components
 
+    # How many sorted and filtered views of the data to keep
+    VIEW_CACHE_SIZE = 8
+
+    def _get_view(self) -> list:
+        """
+        Gets the data sorted by the current sorter and filtered by the current filters. Each
+        combination is only worked out once, and then kept for as long as it's one of the
+        :attr:`VIEW_CACHE_SIZE` most recently used.
+        """
+
+        sorter = self.sorters.current_sorter if self.sorters is not None else None
+        filters = self.filters.current_filters if self.filters is not None else []
+        key = (
+            sorter.id if sorter is not None else None,
+            frozenset(f.id for f in filters),
+        )
+        try:
+            self._views.move_to_end(key)
+            return self._views[key]
+        except KeyError:
+            pass
+
+        view = self.filters.filter(self.data) if self.filters is not None else self.data
+        view = sorter.sorter(view) if sorter is not None else list(view)
+        self._views[key] = view
+        if len(self._views) > self.VIEW_CACHE_SIZE:
+            self._views.popitem(last=False)
+        return view
+
+    async def _count_pages(self) -> None:
+        """
+        Works out :attr:`max_pages` from a :class:`PageSource`, with the current filters.
+        """
+
+        filters = self.filters.current_filters if self.filters is not None else []
+        pages, left_over = divmod(await self.data.count(filters), self.per_page)
+        if left_over:
+            pages += 1
+        self.max_pages = pages
+
     async def get_page(self, page_number: int) -> typing.List[typing.Any]:
         """
         Get a list of items that appear for a given page.
@@ -451,7 +585,15 @@ class Paginator:
         except KeyError:
             pass
         try:
-            if self.sorters is None:
+            if self._data_is_source:
+                v = await self.data.get_page(
+                    page_number,
+                    self.per_page,
+                    self.sorters.current_sorter if self.sorters is not None else None,
+                    self.filters.current_filters if self.filters is not None else [],
+                )
+                self._page_cache[page_number] = v
+            elif self.sorters is None:
                 if inspect.isasyncgenfunction(self.data) or inspect.isasyncgen(
                     self.data
                 ):
@@ -470,14 +612,7 @@ class Paginator:
                     ]
                 self._page_cache[page_number] = v
             else:
-                if (
-                    self.filters is not None
-                    and self.filters.current_filters is not None
-                ):
-                    self.filtered_data = self.filters.filter(self.data)
-                self.filtered_data = self.sorters.current_sorter.sorter(
-                    self.filtered_data
-                )
+                self.filtered_data = self._get_view()
                 v = self.filtered_data[
                     page_number * self.per_page : (page_number + 1) * self.per_page
                 ]
@@ -526,3 +661,274 @@ class Paginator:
         ).set_footer(
             f"Page {m.current_page + 1}/{m.max_pages}",
         )
+
+
+class PersistentPaginator:
+    """
+    A paginator that doesn't wait around for anyone to press its buttons. Everything needed to
+    show a page - whose menu it is, the page number, the sorter and the filters - is stored in
+    the custom IDs of the menu's components, so whichever page someone asks for can be built
+    from scratch by :meth:`dispatch`. Nothing is kept per open menu, other than a few of the
+    most recently used data sources, and menus keep working after a restart.
+
+    Create one per kind of menu when the cog loads, and send :meth:`dispatch` every component
+    interaction:
+    ::
+        self.inventory = utils.PersistentPaginator(
+            "INVENTORY",
+            lambda user_id: utils.InventoryPageSource(bot, user_id),
+            per_page=5,
+            formatter=formatter,
+        )
+
+        @vbu.Cog.listener()
+        async def on_component_interaction(self, interaction):
+            await utils.PersistentPaginator.dispatch(interaction)
+
+        await self.inventory.start(ctx)
+
+    Attributes:
+        name (`str`): The name of the menu, which goes in its custom IDs.
+        per_page (`int`): The number of items that appear on each page.
+        cache_size (`int`): How many users' data sources to keep, most recently used first.
+    """
+
+    # Every persistent paginator, keyed by name
+    paginators: typing.Dict[str, "PersistentPaginator"] = {}
+
+    PREFIX = "PAGINATOR"
+
+    def __init__(
+        self,
+        name: str,
+        data: typing.Callable[[int], typing.Union[typing.Sequence, PageSource]],
+        *,
+        per_page: typing.Optional[int] = 10,
+        formatter: typing.Optional[
+            typing.Callable[
+                ["Paginator", typing.Sequence[typing.Any]],
+                typing.Union[str, discord.Embed, dict],
+            ]
+        ] = None,
+        sorters: typing.Optional[Sorters] = None,
+        filters: typing.Optional[Filters] = None,
+        before_page: typing.Optional[
+            typing.Callable[[int], typing.Awaitable[None]]
+        ] = None,
+        cache_size: typing.Optional[int] = 256,
+    ):
+        """
+        Args:
+            name (`str`): The name of the menu. Must be unique, and can't contain a colon.
+            data (`callable`): A function taking a user's ID and returning the data to paginate
+                for them - a sequence or a :class:`PageSource`.
+            per_page (`int`): The number of items that appear on each page.
+            formatter (`callable`): The same as for :class:`Paginator`. The user the menu's for
+                is :attr:`Paginator.author`.
+            sorters (:class:`Sorters`): The sorters to choose from.
+            filters (:class:`Filters`): The filters to choose from.
+            before_page (`callable`): A coroutine function taking a user's ID, that's awaited
+                before every page is shown to them.
+            cache_size (`int`): How many users' data sources to keep, most recently used first.
+        """
+
+        if ":" in name:
+            raise ValueError("Persistent paginator names can't contain a colon")
+        self.name = name
+        self.data = data
+        self.per_page = per_page
+        self.formatter = formatter
+        self.sorters = sorters
+        self.filters = filters
+        self.before_page = before_page
+        self.cache_size = cache_size
+
+        # user ID -> their data, least recently used first
+        self._data: typing.OrderedDict[int, typing.Any] = collections.OrderedDict()
+
+        self.paginators[name] = self
+
+    def encode(self, paginator: Paginator, action: str) -> str:
+        """
+        Gets the custom ID of a component, holding the action it does and the state of the
+        paginator it's on. Sorters are stored by position and filters as a bitmask, which
+        keeps the ID well under Discord's limit of 100 characters.
+
+        Args:
+            paginator (:class:`Paginator`): The paginator the component is on.
+            action (`str`): What the component does, e.g. `NEXT` or `SORTER`.
+        """
+
+        sorter = 0
+        if paginator.sorters is not None:
+            sorter = list(paginator.sorters.options.values()).index(
+                paginator.sorters.current_sorter
+            )
+        filters = 0
+        if paginator.filters is not None:
+            for bit, f in enumerate(paginator.filters.options.values()):
+                if f in paginator.filters.current_filters:
+                    filters |= 1 << bit
+        return ":".join(
+            (
+                self.PREFIX,
+                self.name,
+                str(paginator.author.id),
+                action,
+                str(paginator.current_page),
+                str(sorter),
+                str(filters),
+            )
+        )
+
+    def _get_data(self, user_id: int) -> typing.Any:
+        """
+        Gets a user's data, from the cache if it's there.
+        """
+
+        try:
+            self._data.move_to_end(user_id)
+            return self._data[user_id]
+        except KeyError:
+            pass
+        data = self._data[user_id] = self.data(user_id)
+        if len(self._data) > self.cache_size:
+            self._data.popitem(last=False)
+        return data
+
+    async def _build(
+        self,
+        author: discord.abc.User,
+        page: int,
+        sorter: int,
+        filters: int,
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """
+        Builds the message for a page of a user's menu.
+
+        Returns:
+            `dict`: The kwargs for sending or editing the message, or `None` if there's
+                nothing to show.
+        """
+
+        if self.before_page is not None:
+            await self.before_page(author.id)
+
+        # Each page gets its own copy of the sorters and filters to set up
+        sorters = copy.copy(self.sorters)
+        if sorters is not None:
+            options = list(sorters.options.values())
+            sorters.current_sorter = options[sorter if sorter < len(options) else 0]
+        filters_ = copy.copy(self.filters)
+        if filters_ is not None:
+            filters_.current_filters = [
+                f
+                for bit, f in enumerate(filters_.options.values())
+                if filters >> bit & 1
+            ]
+
+        paginator = Paginator(
+            self._get_data(author.id),
+            per_page=self.per_page,
+            formatter=self.formatter,
+            sorters=sorters,
+            filters=filters_,
+        )
+        paginator.author = author
+        paginator.persistent = self
+        if paginator._data_is_source:
+            await paginator._count_pages()
+        elif paginator._data_is_iterable:
+            await paginator.get_page(0)  # Works out how many pages there are once filtered
+        if paginator.max_pages == 0 and not (filters_ and filters_.current_filters):
+            return None
+
+        # Make sure the page number is still valid
+        paginator.current_page = max(min(page, paginator.max_pages - 1), 0)
+        items = await paginator.get_page(paginator.current_page)
+        payload = paginator.format_page(items)
+        payload["components"] = paginator.get_pagination_components()
+        return payload
+
+    async def start(self, ctx: commands.Context) -> None:
+        """
+        Sends the first page of the menu. This returns straight away - every other page is
+        shown by :meth:`dispatch`.
+
+        Args:
+            ctx (discord.ext.commands.Context): The context instance for the called command.
+        """
+
+        # Start from scratch, in case the data changed since the menu was last opened
+        self._data.pop(ctx.author.id, None)
+        payload = await self._build(ctx.author, 0, 0, 0)
+        if payload is None:
+            await ctx.send("There's literally nothing here LMAO")
+            return
+        await ctx.send(**payload)
+
+    @classmethod
+    async def dispatch(cls, interaction: discord.Interaction) -> bool:
+        """
+        Shows the page asked for by a component interaction, if it's from a persistent
+        paginator.
+
+        Args:
+            interaction (:class:`discord.Interaction`): The interaction.
+
+        Returns:
+            `bool`: Whether or not the interaction was from a persistent paginator.
+        """
+
+        parts = str(interaction.component.custom_id).split(":")
+        if len(parts) != 7 or parts[0] != cls.PREFIX:
+            return False
+        try:
+            self = cls.paginators[parts[1]]
+            user_id, page, sorter, filters = (int(i) for i in parts[2:3] + parts[4:])
+        except (KeyError, ValueError):
+            return False
+        action = parts[3]
+
+        # Only the person who opened the menu gets to use it
+        if interaction.user.id != user_id:
+            await interaction.response.send_message(
+                "This isn't your menu LMAO", ephemeral=True
+            )
+            return True
+        await interaction.response.defer_update()
+
+        # Work out the new state from what was pressed. Options that don't exist any more
+        # (the menu's from before a restart, say) are ignored.
+        if action == "SORTER" and self.sorters is not None:
+            page = 0
+            ids = list(self.sorters.options)
+            values = [v for v in interaction.data["values"] if v in ids]
+            sorter = ids.index(values[0]) if values else 0
+        elif action == "FILTER" and self.filters is not None:
+            page = 0
+            ids = list(self.filters.options)
+            filters = 0
+            for value in interaction.data["values"]:
+                if value in ids:
+                    filters |= 1 << ids.index(value)
+        else:
+            page = {
+                "START": lambda i: 0,
+                "PREVIOUS": lambda i: i - 1,
+                "NEXT": lambda i: i + 1,
+                "END": lambda i: 2**31,
+            }.get(action, lambda i: i)(page)
+
+        payload = await self._build(interaction.user, page, sorter, filters)
+        if payload is None:
+            payload = {
+                "content": "There's literally nothing here LMAO",
+                "embeds": None,
+                "components": None,
+            }
+        try:
+            await interaction.message.edit(**payload)
+        except discord.errors.NotFound:
+            pass
+        return True
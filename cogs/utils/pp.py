@@ -52,6 +52,39 @@ class Pp:
         self.name = name
         self.size = size
         self.multiplier = multiplier
+        self.version = 0
+        self.flushed_version = 0
+
+        # A function that gets called with the pp whenever it changes
+        self.observer: typing.Optional[typing.Callable[["Pp"], None]] = None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+
+        # Bump the version whenever a persisted value changes
+        if name in ("name", "size", "multiplier"):
+            self.__dict__["version"] = self.__dict__.get("version", 0) + 1
+            observer = self.__dict__.get("observer")
+            if observer is not None:
+                observer(self)
+
+    @property
+    def dirty(self) -> bool:
+        """
+        (`bool`) Whether or not the pp has changed since it was last written to the database.
+        """
+
+        return self.version != self.flushed_version
+
+    def mark_flushed(self, version: int):
+        """
+        Marks the pp as written to the database, as of `version`.
+
+        Args:
+            version (`int`): The version of the pp that was written.
+        """
+
+        self.flushed_version = max(self.flushed_version, version)
 
     def __lt__(self, other):
         return self.size < other.size
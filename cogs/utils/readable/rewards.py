@@ -3,7 +3,6 @@ Functions that format rewards.
 """
 
 import random
-import re
 import typing
 
 from .. import LootableItem
@@ -12,94 +11,58 @@ from .. import LootableItem
 __all__ = ("format_rewards",)
 
 
+# What to call no reward at all
+NOTHING_QUIPS = (
+    "**literally nothing**",
+    "**nothing lmao**",
+    "**nothing L**",
+    "**nothing <a:KEK_COMFY:884797245621420102>**",
+)
+
+# What to call inches
+INCHES_QUIPS = (
+    "cock size",
+    "pp size",
+    "peepee size",
+    "dick size",
+    "inches",
+)
+
+
 def format_rewards(
     *,
     inches: typing.Optional[int] = None,
     items: typing.Optional[typing.List[LootableItem]] = None,
 ):
     """
-    fuckin text
-    """
-
-    # there should be a comment here
-    items_as_text = []
-
-    if not inches:
+    Formats a reward as text, e.g. "a **🎸 guitar**, 2x **🪵 wood**s and **+5 inches**".
 
-        # No reward
-        if not items:
-            return "**{}**".format(
-                random.choice(
-                    [
-                        "literally nothing",
-                        "nothing lmao",
-                        "nothing L",
-                        "nothing <a:KEK_COMFY:884797245621420102>",
-                    ]
-                )
-            )
+    The text for each item is worked out when the item's loaded, so this only has to join it
+    together.
 
-        # Just items as reward
-        item: LootableItem
-        for item in items:
+    Args:
+        inches (`int`): How many inches were won (or lost).
+        items (`list` of :class:`LootableItem`): The items that were won.
 
-            # Some grammar stuff to make this flow better
-            if item.amount == 1:
-                article = (
-                    "an" if re.match(r"^[aeiou]", item.name, re.IGNORECASE) else "a"
-                )
-                items_as_text.append(f"{article} **{item.emoji} {item.name}**")
-
-            else:
-                plural = "" if re.match(r".*s$", item.name, re.IGNORECASE) else "s"
-                items_as_text.append(
-                    f"{item.amount}x **{item.emoji} {item.name}**{plural}"
-                )
-
-        if len(items_as_text) == 1:
-            return items_as_text[0]
-        return "{} and {}".format(", ".join(items_as_text[:-1]), items_as_text[-1])
-
-    else:
-
-        if not items:
-            return "**{}{} {}**".format(
-                "+" if inches > 0 else "",
-                inches,
-                random.choice(
-                    [
-                        "cock size",
-                        "pp size",
-                        "peepee size",
-                        "dick size",
-                        "inches",
-                    ]
-                ),
-            )
-
-    item: LootableItem
-    for item in items:
-        # Some grammar stuff to make this flow better
-        if item.amount == 1:
-            article = "an" if re.match(r"^[aeiou]", item.name, re.IGNORECASE) else "a"
-            items_as_text.append(f"{article} **{item.emoji} {item.name}**")
-        else:
-            plural = "" if re.match(r".*s$", item.name, re.IGNORECASE) else "s"
-            items_as_text.append(f"{item.amount}x **{item.emoji} {item.name}**{plural}")
+    Returns:
+        `str`: The reward.
+    """
 
-    return "{} and {}".format(
-        ", ".join(items_as_text),
-        "**{}{} {}**".format(
-            "+" if inches > 0 else "",
-            inches,
-            random.choice(
-                [
-                    "cock size",
-                    "pp size",
-                    "peepee size",
-                    "dick size",
-                    "inches",
-                ]
-            ),
-        ),
-    )
+    # Each stack shares its item's text, only the amount needs adding
+    items_as_text = [
+        stack.item.display_one
+        if stack.amount == 1
+        else f"{stack.amount}x {stack.item.display}{stack.item.plural}"
+        for stack in items or ()
+    ]
+
+    if inches:
+        items_as_text.append(
+            f"**{'+' if inches > 0 else ''}{inches} {random.choice(INCHES_QUIPS)}**"
+        )
+    elif not items_as_text:
+        return random.choice(NOTHING_QUIPS)
+
+    if len(items_as_text) == 1:
+        return items_as_text[0]
+    return f"{', '.join(items_as_text[:-1])} and {items_as_text[-1]}"
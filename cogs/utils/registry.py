@@ -0,0 +1,240 @@
+import types
+import typing
+
+from discord.ext import vbu
+
+from . import Item
+from .begging import BeggingLocation, CompiledLootTable, Donators
+from .crafting import CraftingGraph, RecipeCycleError
+
+
+__all__ = (
+    "RARITIES",
+    "RegistryError",
+    "ItemIndex",
+    "Registry",
+)
+
+
+# Every rarity, from least to most rare. An item's rarity rank is its position in here.
+RARITIES = ("COMMON", "UNCOMMON", "RARE", "LEGENDARY", "GODLIKE", "ADMIN-ABUSE")
+
+
+class RegistryError(ValueError):
+    """
+    Raised when the item and begging config doesn't make sense, such as a loot table that
+    drops an item that doesn't exist.
+
+    Attributes:
+        problems (`list` of `str`): Everything that's wrong with the config.
+    """
+
+    def __init__(self, problems: typing.List[str]):
+        self.problems = problems
+        super().__init__("; ".join(problems))
+
+
+class ItemIndex:
+    """
+    Lookups over the items in a :class:`Registry`, all worked out when the registry is built
+    so nothing has to scan every item at runtime.
+
+    Attributes:
+        rarity_ranks (`dict`): The rarity rank of each item (`0` for `COMMON` upwards), keyed
+            by item ID.
+    """
+
+    __slots__ = ("rarity_ranks",)
+
+    def __init__(self, items: typing.Mapping[str, Item]):
+        """
+        Args:
+            items (`dict`): Every item, keyed by ID.
+        """
+
+        object.__setattr__(
+            self,
+            "rarity_ranks",
+            types.MappingProxyType(
+                {i.id: RARITIES.index(i.rarity) for i in items.values()}
+            ),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+
+class Registry:
+    """
+    An immutable snapshot of the items and begging config. A new registry is built whenever
+    the config (or one of its emojis) changes and swapped in as `bot.registry` in one go, so a
+    command that holds onto a registry always sees one consistent version of the config.
+
+    Attributes:
+        items (`dict`): The items, as `{"all": ..., "shop": ..., "auction": ...}`, each a
+            read-only mapping of item ID to :class:`Item`.
+        begging (`dict`): The begging config, as `{"locations": ..., "donators": ...}`.
+        signature (`dict`): The signature of the config files this was built from, from
+            :func:`config_signature`.
+        warnings (`tuple` of `str`): Problems with the config that aren't bad enough to stop
+            it being used, such as an item's usage mentioning an item that doesn't exist.
+        index (:class:`ItemIndex`): Lookups over the items.
+        crafting (:class:`CraftingGraph`): The recipes of the items.
+        emoji_ids (`frozenset` of `int`): The IDs of the custom emojis the items and begging
+            locations use.
+    """
+
+    __slots__ = (
+        "items",
+        "begging",
+        "signature",
+        "warnings",
+        "index",
+        "crafting",
+        "emoji_ids",
+    )
+
+    def __init__(
+        self,
+        items: typing.Mapping[str, typing.Mapping[str, Item]],
+        begging: typing.Mapping[str, typing.Any],
+        signature: typing.Optional[dict] = None,
+        warnings: typing.Optional[typing.Tuple[str, ...]] = (),
+    ):
+        """
+        Args:
+            items (`dict`): The items, as `{"all": ..., "shop": ..., "auction": ...}`.
+            begging (`dict`): The begging config, as `{"locations": ..., "donators": ...}`.
+            signature (`dict`): The signature of the config files this was built from.
+            warnings (`tuple` of `str`): Problems with the config that aren't bad enough to
+                stop it being used.
+        """
+
+        object.__setattr__(self, "items", items)
+        object.__setattr__(self, "begging", begging)
+        object.__setattr__(self, "signature", signature)
+        object.__setattr__(self, "warnings", tuple(warnings))
+        object.__setattr__(self, "index", ItemIndex(items["all"]))
+        object.__setattr__(self, "crafting", CraftingGraph(items["all"]))
+        object.__setattr__(
+            self,
+            "emoji_ids",
+            frozenset(
+                i.emoji_id
+                for i in (*items["all"].values(), *begging["locations"])
+                if isinstance(i.emoji_id, int)
+            ),
+        )
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} is immutable")
+
+    @classmethod
+    def build(
+        cls, bot: vbu.Bot, config: dict, signature: typing.Optional[dict] = None
+    ) -> "Registry":
+        """
+        Builds a registry from the config returned by :func:`load_config`, checking that
+        everything the config refers to exists, and looks up its emojis. Emojis are only looked
+        up here, so if they change, build a new registry. Loot tables and
+        recipes that refer to unknown items stop the registry being built, as they'd break
+        commands. Item usages that do are only reported in :attr:`warnings`.
+
+        Args:
+            bot (:class:`vbu.Bot`): The bot used for loading emojis.
+            config (`dict`): The config.
+            signature (`dict`): The signature of the config files.
+
+        Raises:
+            :class:`RegistryError`: If the config doesn't make sense.
+        """
+
+        problems = []
+        warnings = []
+
+        items: typing.Dict[str, Item] = {}
+        for data in config["items"]:
+            try:
+                item = Item.from_dict(bot, data)
+            except (KeyError, TypeError) as e:
+                problems.append(f"Item {data.get('id', '?')} is malformed - {e!r}")
+                continue
+            if item.id in items:
+                problems.append(f"Item {item.id} is defined more than once")
+            if item.rarity not in RARITIES:
+                problems.append(f"Item {item.id} has unknown rarity {item.rarity}")
+            items[item.id] = item
+
+        locations: typing.List[BeggingLocation] = []
+        for data in config["locations"]:
+            try:
+                location = BeggingLocation.from_dict(bot, data, config["quotes"])
+            except (KeyError, TypeError) as e:
+                problems.append(
+                    f"Location {data.get('id', '?')} is malformed - {e!r}"
+                )
+                continue
+            if any(i.id == location.id for i in locations):
+                problems.append(f"Location {location.id} is defined more than once")
+            locations.append(location)
+
+        try:
+            donators = Donators.from_dict(config["donators"])
+        except (KeyError, TypeError) as e:
+            problems.append(f"Donators are malformed - {e!r}")
+
+        # Check that everything refers to items that exist
+        for item in items.values():
+            for recipe in item.recipe:
+                if recipe.id not in items:
+                    problems.append(
+                        f"Item {item.id} is crafted from unknown item {recipe.id}"
+                    )
+            for usage in (*item.usage.crafting, *item.usage.brewing):
+                if usage.id not in items:
+                    warnings.append(
+                        f"Item {item.id} is used to make unknown item {usage.id}"
+                    )
+        for location in locations:
+            for loot in location.loot_table.items:
+                if loot.id not in items:
+                    problems.append(
+                        f"Location {location.id} drops unknown item {loot.id}"
+                    )
+
+        if problems:
+            raise RegistryError(problems)
+
+        # Look the emojis up now, as nothing can change the items once the registry's built
+        for item in items.values():
+            if not item.resolve_emoji(bot):
+                warnings.append(f"Item {item.id} has an unknown emoji")
+        for location in locations:
+            if not location.resolve_emoji(bot):
+                warnings.append(f"Location {location.id} has an unknown emoji")
+
+        # Every item the loot tables drop exists, so they can be compiled
+        for location in locations:
+            location.loot_table.compiled = CompiledLootTable(location.loot_table, items)
+
+        items_config = types.MappingProxyType(
+            {
+                "shop": types.MappingProxyType(
+                    {i.id: i for i in items.values() if i.shop_settings.buyable}
+                ),
+                "auction": types.MappingProxyType(
+                    {i.id: i for i in items.values() if i.shop_settings.auctionable}
+                ),
+                "all": types.MappingProxyType(items),
+            }
+        )
+        begging_config = types.MappingProxyType(
+            {"locations": tuple(locations), "donators": donators}
+        )
+
+        # Recipes that go round in a circle can only be found once the graph is built
+        try:
+            registry = cls(items_config, begging_config, signature, tuple(warnings))
+        except RecipeCycleError as e:
+            raise RegistryError([str(e)])
+        return registry
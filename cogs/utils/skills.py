@@ -50,7 +50,7 @@ async def update_skill(
     await db(
         """
         INSERT INTO user_skill VALUES ($1, $2, $3)
-        ON CONFLICT (user_id, name) DO UPDATE SET experience = user_skill.experience
+        ON CONFLICT (user_id, name) DO UPDATE SET experience = excluded.experience
         """,
         user_id,
         skill_name,
@@ -97,6 +97,39 @@ class Skill:
         self.user_id = user_id
         self.name = name
         self.experience = experience
+        self.version = 0
+        self.flushed_version = 0
+
+        # A function that gets called with the skill whenever it changes
+        self.observer: typing.Optional[typing.Callable[["Skill"], None]] = None
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+
+        # Bump the version whenever the experience changes
+        if name == "experience":
+            self.__dict__["version"] = self.__dict__.get("version", 0) + 1
+            observer = self.__dict__.get("observer")
+            if observer is not None:
+                observer(self)
+
+    @property
+    def dirty(self) -> bool:
+        """
+        (`bool`) Whether or not the skill has changed since it was last written to the database.
+        """
+
+        return self.version != self.flushed_version
+
+    def mark_flushed(self, version: int):
+        """
+        Marks the skill as written to the database, as of `version`.
+
+        Args:
+            version (`int`): The version of the skill that was written.
+        """
+
+        self.flushed_version = max(self.flushed_version, version)
 
     def __lt__(self, other):
         return self.size < other.size
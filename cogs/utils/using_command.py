@@ -5,9 +5,10 @@ from discord.ext import commands, vbu
 class UsingCommand:
     def __init__(self, ctx: commands.SlashContext):
         self.ctx = ctx
+        self.token = None
 
     def __enter__(self):
-        self.ctx.bot.commands_in_use[self.ctx.author.id] = self.ctx
+        self.token = self.ctx.bot.commands_in_use.acquire(self.ctx.author.id, self.ctx)
 
     def __exit__(self, *args, **kwargs):
-        self.ctx.bot.commands_in_use[self.ctx.author.id] = None
+        self.ctx.bot.commands_in_use.release(self.ctx.author.id, self.token)
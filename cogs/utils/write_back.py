@@ -0,0 +1,183 @@
+import time
+import typing
+import asyncio
+import logging
+
+from . import UserCache
+
+
+__all__ = ("WriteBackScheduler",)
+
+
+class WriteBackScheduler:
+    """
+    Decides when the user cache gets written to the database.
+
+    A write happens as soon as `max_dirty` users have unsaved changes, or as soon as any user's
+    changes are `max_staleness` seconds old, whichever comes first. Nothing is written while
+    nothing has changed. Writes are spaced at least `interval` seconds apart - this starts at
+    `min_interval`, doubles (up to `max_interval`) whenever a write takes longer than
+    `target_latency` or fails, and halves again once writes are fast. :meth:`flush_soon` makes
+    the next write happen as soon as the interval allows, such as when the journal can't be
+    written.
+
+    ::
+        scheduler = utils.WriteBackScheduler(bot.user_cache, flush, max_staleness=30)
+        scheduler.start()
+        print(scheduler.queue_depth)
+
+    Attributes:
+        cache (:class:`UserCache`): The cache being written.
+        max_dirty (`int`): How many users can have unsaved changes before a write is started.
+        max_staleness (`float`): How long (in seconds) a user's changes can go unsaved.
+        min_interval (`float`): The shortest time (in seconds) between two writes.
+        max_interval (`float`): The longest time (in seconds) between two writes when backing off.
+        target_latency (`float`): How long (in seconds) a write can take before backing off.
+        interval (`float`): The current shortest time (in seconds) between two writes.
+        latency (`float` or `None`): A moving average of how long (in seconds) writes take.
+    """
+
+    def __init__(
+        self,
+        cache: UserCache,
+        flush: typing.Callable[[], typing.Awaitable[int]],
+        *,
+        max_dirty: typing.Optional[int] = 1_000,
+        max_staleness: typing.Optional[float] = 30.0,
+        min_interval: typing.Optional[float] = 1.0,
+        max_interval: typing.Optional[float] = 60.0,
+        target_latency: typing.Optional[float] = 0.5,
+        logger: typing.Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            cache (:class:`UserCache`): The cache being written.
+            flush (`callable`): A coroutine function that writes the cache's changed users to
+                the database, and returns how many were written.
+            max_dirty (`int`): How many users can have unsaved changes before a write is started.
+            max_staleness (`float`): How long (in seconds) a user's changes can go unsaved.
+            min_interval (`float`): The shortest time (in seconds) between two writes.
+            max_interval (`float`): The longest time (in seconds) between two writes when backing off.
+            target_latency (`float`): How long (in seconds) a write can take before backing off.
+            logger (:class:`logging.Logger`): Where to log writes.
+        """
+
+        self.cache = cache
+        self.flush = flush
+        self.max_dirty = max_dirty
+        self.max_staleness = max_staleness
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_latency = target_latency
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.interval = min_interval
+        self.latency: typing.Optional[float] = None
+        self._last_flush = 0.0
+        self._urgent = False
+        self._wakeup = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        (`int`) The number of users with changes waiting to be written.
+        """
+
+        return self.cache.dirty_count
+
+    def notify(self) -> None:
+        """
+        Tells the scheduler that a user has changes. The scheduler only wakes up if this might
+        change when the next write should happen.
+        """
+
+        depth = self.cache.dirty_count
+        if depth == 1 or depth >= self.max_dirty:
+            self._wakeup.set()
+
+    def flush_soon(self) -> None:
+        """
+        Tells the scheduler that changed users should be written as soon as possible, without
+        waiting for `max_dirty` or `max_staleness`.
+        """
+
+        if self.cache.dirty_count:
+            self._urgent = True
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """
+        Starts scheduling writes.
+        """
+
+        self.cache.dirty_listener = self.notify
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """
+        Stops scheduling writes. A write that's already running isn't interrupted.
+        """
+
+        if self.cache.dirty_listener == self.notify:
+            self.cache.dirty_listener = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def time_until_due(self) -> typing.Optional[float]:
+        """
+        Returns how long (in seconds) until the next write should happen, or `None` if nothing
+        needs writing.
+        """
+
+        depth = self.cache.dirty_count
+        if not depth:
+            return None
+        now = time.monotonic()
+        if depth >= self.max_dirty or self._urgent:
+            due = now
+        else:
+            due = self.cache.oldest_dirty_since + self.max_staleness
+        return max(due, self._last_flush + self.interval) - now
+
+    async def _run(self) -> None:
+        while True:
+            delay = self.time_until_due()
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            depth = self.queue_depth
+            self._urgent = False
+            start = time.perf_counter()
+            try:
+                flushed = await self.flush()
+                latency = time.perf_counter() - start
+                self.logger.info(
+                    f"Writing user cache... success - {flushed}/{depth} users written in {latency:.3f}s"
+                )
+            except Exception as e:
+                latency = None
+                self.logger.error(f"Writing user cache... failed - {e}")
+            self._last_flush = time.monotonic()
+            self._adapt(latency)
+
+    def _adapt(self, latency: typing.Optional[float]) -> None:
+        """
+        Backs off if the database is slow (or the write failed), and recovers if it isn't.
+        """
+
+        if latency is not None:
+            self.latency = (
+                latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+            )
+        if latency is None or self.latency > self.target_latency:
+            self.interval = min(self.interval * 2, self.max_interval)
+        else:
+            self.interval = max(self.interval / 2, self.min_interval)